@@ -1,4 +1,5 @@
 import os
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -33,6 +34,25 @@ def get_url():
     return str(settings.SQLALCHEMY_DATABASE_URI)
 
 
+# Partitions of item, created by the migrations and not declared in the models;
+# autogenerate would otherwise drop them with all the items. Their indexes and
+# the foreign keys referencing them are clones of those of item.
+PARTITION_TABLE = re.compile(r"item_p\d+")
+# Expression indexes that autogenerate cannot compare, always seen as changed
+EXPRESSION_INDEXES = {"ix_item_owner_id_title"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table":
+        return not PARTITION_TABLE.fullmatch(name)
+    if type_ == "index" and name in EXPRESSION_INDEXES:
+        return False
+    tables = [object.table] if hasattr(object, "table") else []
+    if type_ == "foreign_key_constraint":
+        tables.append(object.referred_table)
+    return not any(PARTITION_TABLE.fullmatch(table.name) for table in tables)
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -47,7 +67,11 @@ def run_migrations_offline():
     """
     url = get_url()
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -71,7 +95,10 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
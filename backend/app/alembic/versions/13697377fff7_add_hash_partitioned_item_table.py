@@ -0,0 +1,75 @@
+"""Add hash partitioned item table
+
+Creates item_partitioned, hash partitioned on owner_id, and triggers that
+mirror every write on item into it. Existing rows are copied online with
+`python -m app.partition_items`, then d4f1152a82df swaps the tables.
+
+Revision ID: 13697377fff7
+Revises: 2b55618e76d6
+Create Date: 2026-10-19 10:02:41.903115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '13697377fff7'
+down_revision = '2b55618e76d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The primary key of a partitioned table must contain the partition key
+    op.execute("""
+        CREATE TABLE item_partitioned (
+            id UUID NOT NULL,
+            owner_id UUID NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+            title VARCHAR(255) NOT NULL,
+            description VARCHAR(255),
+            CONSTRAINT item_partitioned_pkey PRIMARY KEY (id, owner_id)
+        ) PARTITION BY HASH (owner_id)
+    """)
+    # Fixed here so that every database gets the same partitions; changing it
+    # later requires repartitioning the table
+    partition_count = 16
+    for remainder in range(partition_count):
+        op.execute(f"""
+            CREATE TABLE item_p{remainder:03d} PARTITION OF item_partitioned
+            FOR VALUES WITH (MODULUS {partition_count}, REMAINDER {remainder})
+        """)
+    op.create_index('ix_item_partitioned_owner_id', 'item_partitioned', ['owner_id'])
+
+    # Upserts, so a row copied by partition_items from an older snapshot never
+    # overwrites a newer version written here
+    op.execute("""
+        CREATE FUNCTION item_partitioned_sync() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.owner_id <> OLD.owner_id) THEN
+                DELETE FROM item_partitioned
+                WHERE id = OLD.id AND owner_id = OLD.owner_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO item_partitioned (id, owner_id, title, description)
+                VALUES (NEW.id, NEW.owner_id, NEW.title, NEW.description)
+                ON CONFLICT (id, owner_id) DO UPDATE
+                SET title = EXCLUDED.title, description = EXCLUDED.description;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER item_partitioned_sync
+        AFTER INSERT OR UPDATE OR DELETE ON item
+        FOR EACH ROW EXECUTE FUNCTION item_partitioned_sync()
+    """)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER item_partitioned_sync ON item')
+    op.execute('DROP FUNCTION item_partitioned_sync()')
+    op.drop_table('item_partitioned')
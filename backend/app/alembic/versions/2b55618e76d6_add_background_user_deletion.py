@@ -0,0 +1,35 @@
+"""Add background user deletion
+
+Revision ID: 2b55618e76d6
+Revises: 1a31ce608336
+Create Date: 2026-10-19 09:12:05.418226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '2b55618e76d6'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('pending_deletion', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.create_table('userdeletion',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('requested_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('items_total', sa.Integer(), nullable=True),
+    sa.Column('items_deleted', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('userdeletion')
+    op.drop_column('user', 'pending_deletion')
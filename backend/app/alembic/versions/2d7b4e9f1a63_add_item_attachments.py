@@ -0,0 +1,66 @@
+"""Add item attachments
+
+Revision ID: 2d7b4e9f1a63
+Revises: 8e3f61d2c5a4
+Create Date: 2026-10-19 23:14:52.408117
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "2d7b4e9f1a63"
+down_revision = "8e3f61d2c5a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "itemattachment",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("item_id", sa.Uuid(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "filename", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False
+        ),
+        sa.Column(
+            "content_type",
+            sqlmodel.sql.sqltypes.AutoString(length=255),
+            nullable=False,
+        ),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "sha256", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        # The primary key of the partitioned item table includes owner_id
+        sa.ForeignKeyConstraint(
+            ["item_id", "owner_id"],
+            ["item.id", "item.owner_id"],
+            name="itemattachment_item_id_owner_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_itemattachment_item_id_created_at",
+        "itemattachment",
+        ["item_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_itemattachment_item_id_created_at", table_name="itemattachment"
+    )
+    op.drop_table("itemattachment")
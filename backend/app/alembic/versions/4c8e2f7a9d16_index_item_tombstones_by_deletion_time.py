@@ -0,0 +1,25 @@
+"""Index item tombstones by deletion time
+
+Revision ID: 4c8e2f7a9d16
+Revises: 7a4d2c91e5b3
+Create Date: 2026-10-19 21:05:37.184290
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4c8e2f7a9d16"
+down_revision = "7a4d2c91e5b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_itemtombstone_deleted_at", "itemtombstone", ["deleted_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_itemtombstone_deleted_at", table_name="itemtombstone")
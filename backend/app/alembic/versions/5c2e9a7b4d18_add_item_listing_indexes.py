@@ -0,0 +1,42 @@
+"""Add item listing indexes
+
+Revision ID: 5c2e9a7b4d18
+Revises: a6e1c4f09b37
+Create Date: 2026-10-19 21:48:27.316054
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c2e9a7b4d18"
+down_revision = "a6e1c4f09b37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (owner_id, id) also serves the lookups on owner_id alone, it replaces
+    # ix_item_owner_id
+    op.create_index("ix_item_owner_id_id", "item", ["owner_id", "id"], unique=False)
+    op.drop_index("ix_item_owner_id", table_name="item")
+    op.create_index(
+        "ix_item_owner_id_title",
+        "item",
+        ["owner_id", sa.text('title COLLATE "C"'), "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_item_owner_id_created_at",
+        "item",
+        ["owner_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_item_owner_id_created_at", table_name="item")
+    op.drop_index("ix_item_owner_id_title", table_name="item")
+    op.create_index("ix_item_owner_id", "item", ["owner_id"], unique=False)
+    op.drop_index("ix_item_owner_id_id", table_name="item")
@@ -0,0 +1,55 @@
+"""Notify item changes
+
+Revision ID: 5f3c2a9e7d41
+Revises: b0226dad9b34
+Create Date: 2026-10-19 14:02:51.208113
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5f3c2a9e7d41"
+down_revision = "b0226dad9b34"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The payload carries the same (changed at, id) position as the delta sync
+    # watermark, deletes use now() like the tombstone default
+    op.execute(
+        """
+        CREATE FUNCTION notify_item_change() RETURNS trigger AS $$
+        DECLARE
+            changed item%ROWTYPE;
+            changed_at timestamptz;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+                changed_at := now();
+            ELSE
+                changed := NEW;
+                changed_at := NEW.updated_at;
+            END IF;
+            PERFORM pg_notify('item_changes', json_build_object(
+                'op', CASE TG_OP WHEN 'DELETE' THEN 'delete' ELSE 'upsert' END,
+                'id', changed.id,
+                'owner_id', changed.owner_id,
+                'at', (extract(epoch FROM changed_at) * 1000000)::bigint
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER item_notify AFTER INSERT OR UPDATE OR DELETE ON item "
+        "FOR EACH ROW EXECUTE FUNCTION notify_item_change()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER item_notify ON item")
+    op.execute("DROP FUNCTION notify_item_change()")
@@ -0,0 +1,107 @@
+"""Notify item changes per statement
+
+Revision ID: 7a4d2c91e5b3
+Revises: 2d7b4e9f1a63
+Create Date: 2026-10-19 18:40:12.530417
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "7a4d2c91e5b3"
+down_revision = "2d7b4e9f1a63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("DROP TRIGGER item_notify ON item")
+    op.execute("DROP FUNCTION notify_item_change()")
+    # One notification per statement instead of one per row: the changes
+    # themselves up to 50 rows, which keeps the payload under the 8000 bytes
+    # limit of NOTIFY, otherwise only the owners whose streams must resync
+    # (null for every stream past 50 owners). Positions are the (changed at,
+    # id) of the delta sync watermark, deletes use now() like the tombstones.
+    op.execute(
+        """
+        CREATE FUNCTION notify_item_changes() RETURNS trigger AS $$
+        DECLARE
+            change_count bigint;
+            owner_count bigint;
+            payload json;
+        BEGIN
+            SELECT count(*), count(DISTINCT owner_id)
+            INTO change_count, owner_count
+            FROM changed;
+            IF change_count = 0 THEN
+                RETURN NULL;
+            ELSIF change_count <= 50 THEN
+                SELECT json_build_object(
+                    'op', CASE TG_OP WHEN 'DELETE' THEN 'delete' ELSE 'upsert' END,
+                    'changes', json_agg(json_build_array(
+                        id,
+                        owner_id,
+                        (extract(epoch FROM CASE TG_OP
+                            WHEN 'DELETE' THEN now() ELSE updated_at
+                        END) * 1000000)::bigint
+                    ))
+                )
+                INTO payload
+                FROM changed;
+            ELSIF owner_count <= 50 THEN
+                SELECT json_build_object('resync', json_agg(DISTINCT owner_id))
+                INTO payload
+                FROM changed;
+            ELSE
+                payload := json_build_object('resync', NULL);
+            END IF;
+            PERFORM pg_notify('item_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Transition tables are only allowed on single event triggers
+    for event, table in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        op.execute(
+            f"CREATE TRIGGER item_notify_{event.lower()} AFTER {event} ON item "
+            f"REFERENCING {table} TABLE AS changed "
+            "FOR EACH STATEMENT EXECUTE FUNCTION notify_item_changes()"
+        )
+
+
+def downgrade():
+    for event in ("insert", "update", "delete"):
+        op.execute(f"DROP TRIGGER item_notify_{event} ON item")
+    op.execute("DROP FUNCTION notify_item_changes()")
+    op.execute(
+        """
+        CREATE FUNCTION notify_item_change() RETURNS trigger AS $$
+        DECLARE
+            changed item%ROWTYPE;
+            changed_at timestamptz;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+                changed_at := now();
+            ELSE
+                changed := NEW;
+                changed_at := NEW.updated_at;
+            END IF;
+            PERFORM pg_notify('item_changes', json_build_object(
+                'op', CASE TG_OP WHEN 'DELETE' THEN 'delete' ELSE 'upsert' END,
+                'id', changed.id,
+                'owner_id', changed.owner_id,
+                'at', (extract(epoch FROM changed_at) * 1000000)::bigint
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER item_notify AFTER INSERT OR UPDATE OR DELETE ON item "
+        "FOR EACH ROW EXECUTE FUNCTION notify_item_change()"
+    )
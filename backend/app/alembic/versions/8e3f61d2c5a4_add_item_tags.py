@@ -0,0 +1,38 @@
+"""Add item tags
+
+Revision ID: 8e3f61d2c5a4
+Revises: 5c2e9a7b4d18
+Create Date: 2026-10-19 22:31:05.672913
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8e3f61d2c5a4"
+down_revision = "5c2e9a7b4d18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default is stored in the catalog, the table is not rewritten
+    op.add_column(
+        "item",
+        sa.Column(
+            "tags",
+            postgresql.ARRAY(sa.String()),
+            server_default=sa.text("'{}'"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_item_tags", "item", ["tags"], unique=False, postgresql_using="gin"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_item_tags", table_name="item", postgresql_using="gin")
+    op.drop_column("item", "tags")
@@ -0,0 +1,40 @@
+"""Add user search trigram indexes
+
+Revision ID: a6e1c4f09b37
+Revises: f3b8d21c7e90
+Create Date: 2026-10-19 21:03:11.902467
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "a6e1c4f09b37"
+down_revision = "f3b8d21c7e90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm ships with the contrib modules, which the server must provide
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_user_email_trgm",
+        "user",
+        ["email"],
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_user_full_name_trgm",
+        "user",
+        ["full_name"],
+        postgresql_using="gin",
+        postgresql_ops={"full_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_full_name_trgm", table_name="user")
+    op.drop_index("ix_user_email_trgm", table_name="user")
@@ -0,0 +1,72 @@
+"""Add item timestamps and tombstones
+
+Revision ID: b0226dad9b34
+Revises: d4f1152a82df
+Create Date: 2026-10-19 11:20:36.512870
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "b0226dad9b34"
+down_revision = "d4f1152a82df"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # now() is stable, so existing rows get the default without a table rewrite
+    op.add_column(
+        "item",
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "item",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_item_owner_id_updated_at",
+        "item",
+        ["owner_id", "updated_at", "id"],
+        unique=False,
+    )
+    op.create_table(
+        "itemtombstone",
+        sa.Column("item_id", sa.Uuid(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("item_id"),
+    )
+    op.create_index(
+        "ix_itemtombstone_owner_id_deleted_at",
+        "itemtombstone",
+        ["owner_id", "deleted_at", "item_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_itemtombstone_owner_id_deleted_at", table_name="itemtombstone")
+    op.drop_table("itemtombstone")
+    op.drop_index("ix_item_owner_id_updated_at", table_name="item")
+    op.drop_column("item", "updated_at")
+    op.drop_column("item", "created_at")
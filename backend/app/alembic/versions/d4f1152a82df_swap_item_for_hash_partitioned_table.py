@@ -0,0 +1,80 @@
+"""Swap item for its hash partitioned copy
+
+Copies whatever partition_items has not copied yet while item is locked, so
+run the tool first on large tables to keep the lock short.
+
+Revision ID: d4f1152a82df
+Revises: 13697377fff7
+Create Date: 2026-10-19 10:04:17.226390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f1152a82df'
+down_revision = '13697377fff7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('LOCK TABLE item IN ACCESS EXCLUSIVE MODE')
+    op.execute("""
+        INSERT INTO item_partitioned (id, owner_id, title, description)
+        SELECT id, owner_id, title, description FROM item
+        ON CONFLICT (id, owner_id) DO NOTHING
+    """)
+    op.execute('DROP TRIGGER item_partitioned_sync ON item')
+    op.execute('DROP FUNCTION item_partitioned_sync()')
+    op.drop_table('item')
+    op.rename_table('item_partitioned', 'item')
+    op.execute('ALTER TABLE item RENAME CONSTRAINT item_partitioned_pkey TO item_pkey')
+    op.execute('ALTER TABLE item RENAME CONSTRAINT item_partitioned_owner_id_fkey TO item_owner_id_fkey')
+    op.execute('ALTER INDEX ix_item_partitioned_owner_id RENAME TO ix_item_owner_id')
+
+
+def downgrade():
+    # Back to the state left by 13697377fff7: a plain item table mirrored into
+    # item_partitioned by the sync trigger
+    op.execute('ALTER INDEX ix_item_owner_id RENAME TO ix_item_partitioned_owner_id')
+    op.execute('ALTER TABLE item RENAME CONSTRAINT item_owner_id_fkey TO item_partitioned_owner_id_fkey')
+    op.execute('ALTER TABLE item RENAME CONSTRAINT item_pkey TO item_partitioned_pkey')
+    op.rename_table('item', 'item_partitioned')
+    op.create_table('item',
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('title', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('owner_id', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO item (id, owner_id, title, description)
+        SELECT id, owner_id, title, description FROM item_partitioned
+    """)
+    op.execute("""
+        CREATE FUNCTION item_partitioned_sync() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.owner_id <> OLD.owner_id) THEN
+                DELETE FROM item_partitioned
+                WHERE id = OLD.id AND owner_id = OLD.owner_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO item_partitioned (id, owner_id, title, description)
+                VALUES (NEW.id, NEW.owner_id, NEW.title, NEW.description)
+                ON CONFLICT (id, owner_id) DO UPDATE
+                SET title = EXCLUDED.title, description = EXCLUDED.description;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER item_partitioned_sync
+        AFTER INSERT OR UPDATE OR DELETE ON item
+        FOR EACH ROW EXECUTE FUNCTION item_partitioned_sync()
+    """)
@@ -0,0 +1,31 @@
+"""Case-insensitive user email
+
+Revision ID: f3b8d21c7e90
+Revises: c7a94e02f5b8
+Create Date: 2026-10-19 19:12:40.318244
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f3b8d21c7e90"
+down_revision = "c7a94e02f5b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if two users already have emails differing only by case, they
+    # have to be merged or renamed first
+    op.create_index(
+        "ix_user_email_lower", "user", [sa.text("lower(email)")], unique=True
+    )
+    op.drop_index("ix_user_email", table_name="user")
+
+
+def downgrade():
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+    op.drop_index("ix_user_email_lower", table_name="user")
@@ -0,0 +1,185 @@
+import base64
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import quote
+
+import anyio
+from fastapi.responses import Response
+from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import Receive, Scope, Send
+
+from app.core.storage import Storage
+
+
+class RangeNotSatisfiableError(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Bytes requested by a Range header, from the first up to the last excluded.
+
+    Return None for the whole file when the header is not a single byte range
+    (several ranges are answered with the whole file, which RFC 9110 allows),
+    and raise RangeNotSatisfiableError if the range starts past the end.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash or not (first or last):
+        return None
+    if not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Suffix range, the last bytes of the file
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiableError
+        return max(size - length, 0), size
+    start = int(first)
+    end = int(last) + 1 if last else None
+    if end is not None and end <= start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError
+    return start, size if end is None else min(end, size)
+
+
+def _parse_date(value: str) -> datetime | None:
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # HTTP dates are in GMT, "-0000" dates are parsed without a timezone
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+class StoredFileResponse(Response):
+    """
+    File of a storage backend, answering conditional and single byte range
+    requests.
+
+    The file is sent with the http.response.zerocopysend ASGI extension
+    (sendfile) when the server supports it and the file is local, or
+    http.response.pathsend for a whole local file; otherwise it is read in
+    chunks by a thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        storage: Storage,
+        key: str,
+        size: int,
+        sha256: str,
+        last_modified: datetime,
+        media_type: str,
+        filename: str,
+    ) -> None:
+        self.storage = storage
+        self.key = key
+        self.size = size
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        # The content of a key never changes, so its hash is a strong validator
+        self.etag = f'"{sha256}"'
+        self.last_modified = last_modified.astimezone(timezone.utc).replace(
+            microsecond=0
+        )
+        digest = base64.b64encode(bytes.fromhex(sha256)).decode()
+        self.init_headers(
+            {
+                "accept-ranges": "bytes",
+                "etag": self.etag,
+                "last-modified": format_datetime(self.last_modified, usegmt=True),
+                "repr-digest": f"sha-256=:{digest}:",
+                "content-disposition": "attachment; filename*=utf-8''"
+                + quote(filename, safe=""),
+            }
+        )
+
+    def _not_modified(self, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers:
+            tags = [tag.strip() for tag in request_headers["if-none-match"].split(",")]
+            # Weak comparison, as the If-None-Match of GET and HEAD
+            return "*" in tags or self.etag in (tag.removeprefix("W/") for tag in tags)
+        if "if-modified-since" in request_headers:
+            since = _parse_date(request_headers["if-modified-since"])
+            return since is not None and self.last_modified <= since
+        return False
+
+    def _range_applies(self, request_headers: Headers) -> bool:
+        if "if-range" not in request_headers:
+            return True
+        if_range = request_headers["if-range"].strip()
+        if if_range.startswith(('"', "W/")):
+            return if_range == self.etag
+        return _parse_date(if_range) == self.last_modified
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        headers = MutableHeaders(raw=self.raw_headers)
+        status = self.status_code
+        start, end = 0, self.size
+        if self._not_modified(request_headers):
+            status = 304
+            del headers["content-type"]
+            start = end
+        elif "range" in request_headers and self._range_applies(request_headers):
+            try:
+                byte_range = parse_range(request_headers["range"], self.size)
+            except RangeNotSatisfiableError:
+                status = 416
+                headers["content-range"] = f"bytes */{self.size}"
+                start = end
+            else:
+                if byte_range is not None:
+                    status = 206
+                    start, end = byte_range
+                    headers["content-range"] = f"bytes {start}-{end - 1}/{self.size}"
+        if status != 304:
+            headers["content-length"] = str(end - start)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers.raw,
+            }
+        )
+        if scope["method"].upper() == "HEAD" or start == end:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._send_file(scope, send, start, end)
+
+    async def _send_file(self, scope: Scope, send: Send, start: int, end: int) -> None:
+        extensions = scope.get("extensions") or {}
+        path = self.storage.local_path(self.key)
+        if path is not None and "http.response.zerocopysend" in extensions:
+            file = await anyio.to_thread.run_sync(path.open, "rb")
+            try:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": start,
+                        "count": end - start,
+                    }
+                )
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+            return
+        if (
+            path is not None
+            and "http.response.pathsend" in extensions
+            and (start, end) == (0, self.size)
+        ):
+            await send({"type": "http.response.pathsend", "path": str(path)})
+            return
+        async for chunk in iterate_in_threadpool(
+            self.storage.read(self.key, start, end)
+        ):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,108 @@
+from collections.abc import Callable, Coroutine
+from contextvars import ContextVar
+from typing import Any
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+MEDIA_TYPE = "application/msgpack"
+# Media types of MessagePack, "x-" is still sent by some clients
+_MEDIA_TYPES = {MEDIA_TYPE, "application/x-msgpack"}
+
+# Whether the request being handled asked for a MessagePack response
+msgpack_requested: ContextVar[bool] = ContextVar("msgpack_requested", default=False)
+
+
+class MsgpackResponse(Response):
+    media_type = MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content)  # type: ignore[no-any-return]
+
+
+class MsgpackRequest(Request):
+    """
+    Request with a MessagePack body, decoded where FastAPI reads JSON bodies.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+
+def _media_type(value: str) -> str:
+    return value.partition(";")[0].strip().lower()
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """
+    Whether the Accept header prefers MessagePack to JSON, an explicit
+    MessagePack entry winning ties.
+    """
+    qualities: dict[str, float] = {}
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[_media_type(media_type)] = quality
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in _MEDIA_TYPES)
+    json_quality = qualities.get(
+        "application/json", qualities.get("application/*", qualities.get("*/*", 0.0))
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+class MsgpackRoute(APIRoute):
+    """
+    Route that also speaks MessagePack.
+
+    A body sent as application/msgpack is decoded and validated like a JSON
+    one, and the response is serialized with MessagePack instead of JSON when
+    the Accept header prefers it. Errors raised outside the route, such as
+    validation errors, stay JSON.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        json_handler = super().get_route_handler()
+        response_class = self.response_class
+        self.response_class = MsgpackResponse
+        try:
+            msgpack_handler = super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+        async def handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "")
+            if self.body_field and _media_type(content_type) in _MEDIA_TYPES:
+                # FastAPI only reads the body of JSON requests with json(); routes
+                # reading the raw body get it as it was sent
+                headers = [
+                    (name, value)
+                    for name, value in request.scope["headers"]
+                    if name != b"content-type"
+                ]
+                headers.append((b"content-type", b"application/json"))
+                request = MsgpackRequest(
+                    {**request.scope, "headers": headers}, request.receive
+                )
+            use_msgpack = accepts_msgpack(request.headers.get("accept", ""))
+            token = msgpack_requested.set(use_msgpack)
+            try:
+                if use_msgpack:
+                    response = await msgpack_handler(request)
+                else:
+                    response = await json_handler(request)
+            finally:
+                msgpack_requested.reset(token)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return handler
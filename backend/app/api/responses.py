@@ -0,0 +1,20 @@
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.api.msgpack import MsgpackResponse, msgpack_requested
+
+
+def model_response(model: BaseModel) -> Response:
+    """
+    JSON response of a model that is already of the route's response_model.
+
+    FastAPI validates a returned object against the response_model and encodes
+    it with jsonable_encoder before serializing it, returning a Response skips
+    both: the model is serialized once by pydantic-core. The response_model of
+    the route is still used for the OpenAPI schema.
+
+    The model is sent as MessagePack instead when the request asked for it.
+    """
+    if msgpack_requested.get():
+        return MsgpackResponse(model.model_dump(mode="json"))
+    return Response(model.model_dump_json(), media_type="application/json")
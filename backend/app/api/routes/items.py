@@ -1,44 +1,304 @@
+import asyncio
 import uuid
-from typing import Any
+from collections.abc import AsyncGenerator
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Annotated, Any, Literal, NoReturn
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import BatchIds, CurrentUser, SessionDep, StorageDep
+from app.api.downloads import StoredFileResponse
+from app.api.msgpack import MsgpackRoute
+from app.api.responses import model_response
+from app.attachments import (
+    AttachmentTooLargeError,
+    ChecksumMismatchError,
+    attachment_key,
+    parse_content_digest,
+    store_upload,
+)
+from app.core.cache import ALL_OWNERS, item_list_cache, item_tags_cache
+from app.core.config import settings
+from app.core.db import engine
+from app.core.events import SubscriberLimitError, Subscription, item_change_broker
+from app.group_commit import item_create_batcher
+from app.loaders import item_loader
+from app.models import (
+    Item,
+    ItemAttachment,
+    ItemAttachmentPublic,
+    ItemAttachmentsPublic,
+    ItemChanges,
+    ItemCreate,
+    ItemPublic,
+    ItemsBatch,
+    ItemsPublic,
+    ItemTagsPublic,
+    ItemUpdate,
+    Message,
+    User,
+)
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=MsgpackRoute)
+
+
+def _read_items_page(
+    owner_id: uuid.UUID | None, skip: int, limit: int, **filters: Any
+) -> ItemsPublic:
+    # Used by background cache refreshes, which outlive the request session
+    with Session(engine) as session:
+        return crud.read_items_page(
+            session=session, owner_id=owner_id, skip=skip, limit=limit, **filters
+        )
+
+
+def _parse_tags(tags: str | None) -> tuple[str, ...]:
+    # Sorted, so that the same tags share a cache entry whatever their order
+    return tuple(
+        sorted({tag.strip().lower() for tag in (tags or "").split(",")} - {""})
+    )
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Literal["title", "created_at", "id"] | None = None,
+    order: Literal["asc", "desc"] = "asc",
+    title_prefix: Annotated[str | None, Query(min_length=1, max_length=255)] = None,
+    has_description: bool | None = None,
+    tags: str | None = None,
+    tags_match: Literal["any", "all"] = "any",
+    owner_id: uuid.UUID | None = None,
 ) -> Any:
     """
-    Retrieve items.
-    """
+    Retrieve items, sorted by title, created_at or id and filtered by title
+    prefix, by whether they have a description and by comma-separated `tags`,
+    any or all of them. Superusers get the items of everyone, or of `owner_id`.
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
+    Only the combinations served by an index are accepted: the items of
+    everyone can only be sorted by id, without title prefix, and a title
+    prefix can only be sorted by title.
+    """
+    if not current_user.is_superuser:
+        if owner_id not in (None, current_user.id):
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        owner_id = current_user.id
+    filters: dict[str, Any] = {
+        "sort": sort,
+        "descending": order == "desc",
+        "title_prefix": title_prefix,
+        "has_description": has_description,
+        "tags": _parse_tags(tags),
+        "all_tags": tags_match == "all",
+    }
+    try:
+        page = item_list_cache.get_or_load(
+            str(owner_id) if owner_id else ALL_OWNERS,
+            (skip, limit, *filters.values()),
+            load=partial(
+                crud.read_items_page,
+                session=session,
+                owner_id=owner_id,
+                skip=skip,
+                limit=limit,
+                **filters,
+            ),
+            refresh=partial(_read_items_page, owner_id, skip, limit, **filters),
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    except crud.UnindexedItemQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return model_response(page)
+
+
+def _watermark_expired(since: tuple[datetime, uuid.UUID]) -> bool:
+    # Deletions before it may have been pruned with their tombstones
+    retention = timedelta(days=settings.ITEM_TOMBSTONE_RETENTION_DAYS)
+    return since[0] < datetime.now(timezone.utc) - retention
+
+
+@router.get("/changes", response_model=ItemChanges)
+def read_item_changes(
+    session: SessionDep,
+    current_user: CurrentUser,
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=settings.ITEM_SYNC_MAX_LIMIT)] = 100,
+) -> Any:
+    """
+    Retrieve own items inserted, updated or deleted after the `since` watermark
+    of a previous sync, all of them if omitted.
+
+    A watermark older than the retention of deleted items is refused with 410:
+    the client must sync again without one.
+    """
+    try:
+        position = crud.decode_watermark(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+    if position and _watermark_expired(position):
+        raise HTTPException(status_code=410, detail="Watermark expired")
+    return crud.read_item_changes(
+        session=session,
+        owner_id=current_user.id,
+        since=position,
+        limit=limit,
+        safety_window=timedelta(seconds=settings.ITEM_SYNC_SAFETY_WINDOW_SECONDS),
+    )
+
+
+def _read_all_item_changes(
+    owner_id: uuid.UUID | None, since: tuple[datetime, uuid.UUID]
+) -> ItemChanges:
+    # Stream replays run after the request session is closed
+    with Session(engine) as session:
+        return crud.read_item_changes(
+            session=session,
+            owner_id=owner_id,
+            since=since,
+            limit=500,
+            # Changes committed after the replay are notified to the stream
+            safety_window=timedelta(),
         )
-        items = session.exec(statement).all()
 
-    return ItemsPublic(data=items, count=count)
+
+def _server_sent_event(event: str, data: str = "", id: str | None = None) -> str:
+    lines = [f"event: {event}"]
+    if id:
+        lines.append(f"id: {id}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _stream_item_changes(
+    subscription: Subscription, since: tuple[datetime, uuid.UUID] | None
+) -> AsyncGenerator[str, None]:
+    resync = since is not None
+    try:
+        while True:
+            if resync:
+                resync = False
+                if since is not None and _watermark_expired(since):
+                    since = None
+                if since is None:
+                    yield _server_sent_event("resync")
+                while since is not None:
+                    changes = await run_in_threadpool(
+                        _read_all_item_changes, subscription.owner_id, since
+                    )
+                    if changes.watermark:
+                        since = crud.decode_watermark(changes.watermark)
+                    if changes.upserted or changes.deleted:
+                        yield _server_sent_event(
+                            "sync", changes.model_dump_json(), changes.watermark
+                        )
+                    if not changes.has_more:
+                        break
+            try:
+                change = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.ITEMS_STREAM_HEARTBEAT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if change is None:
+                resync = True
+                continue
+            position, event = change
+            since = max(since, position) if since else position
+            yield _server_sent_event(
+                event.op, event.model_dump_json(), crud.encode_watermark(*since)
+            )
+    finally:
+        item_change_broker.unsubscribe(subscription)
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_items(
+    current_user: CurrentUser,
+    last_event_id: Annotated[str | None, Header()] = None,
+) -> StreamingResponse:
+    """
+    Stream item changes as server-sent events, own items only unless superuser.
+
+    Reconnecting with `Last-Event-ID` first replays the missed changes as
+    `sync` events in the format of /items/changes. Changes may be sent twice,
+    a `resync` event means some were lost and the items must be reloaded.
+    """
+    try:
+        since = crud.decode_watermark(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+    owner_id = None if current_user.is_superuser else current_user.id
+    try:
+        subscription = item_change_broker.subscribe(owner_id)
+    except SubscriberLimitError:
+        raise HTTPException(status_code=503, detail="Too many item streams")
+    return StreamingResponse(
+        _stream_item_changes(subscription, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also unsubscribes if the client leaves before the stream starts
+        background=BackgroundTask(item_change_broker.unsubscribe, subscription),
+    )
+
+
+def _read_item_tags(owner_id: uuid.UUID) -> ItemTagsPublic:
+    with Session(engine) as session:
+        return crud.read_item_tags(session=session, owner_id=owner_id)
+
+
+@router.get("/tags", response_model=ItemTagsPublic)
+def read_item_tags(
+    session: SessionDep, current_user: CurrentUser, owner_id: uuid.UUID | None = None
+) -> Any:
+    """
+    Count own items by tag, most used tags first. Superusers can count the
+    items of `owner_id`.
+    """
+    if owner_id is None:
+        owner_id = current_user.id
+    elif not current_user.is_superuser and owner_id != current_user.id:
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    tags = item_tags_cache.get_or_load(
+        str(owner_id),
+        "tags",
+        load=partial(crud.read_item_tags, session=session, owner_id=owner_id),
+        refresh=partial(_read_item_tags, owner_id),
+    )
+    return model_response(tags)
+
+
+@router.get("/batch", response_model=ItemsBatch)
+def read_items_batch(
+    session: SessionDep, current_user: CurrentUser, ids: BatchIds
+) -> Any:
+    """
+    Get items by ID in one call, sorted into found, missing and forbidden ones
+    as by single item reads.
+    """
+    requested = list(dict.fromkeys(ids))
+    items = {
+        item.id: item for item in crud.read_items_by_ids(session=session, ids=requested)
+    }
+    batch = ItemsBatch.model_construct(found=[], missing=[], forbidden=[])
+    for id in requested:
+        item = items.get(id)
+        if item is None:
+            batch.missing.append(id)
+        elif not current_user.is_superuser and item.owner_id != current_user.id:
+            batch.forbidden.append(id)
+        else:
+            batch.found.append(item)
+    return model_response(batch)
 
 
 @router.get("/{id}", response_model=ItemPublic)
@@ -46,7 +306,7 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
     """
     Get item by ID.
     """
-    item = session.get(Item, id)
+    item = item_loader.get(session, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
@@ -55,17 +315,24 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
+async def create_item(
     *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-    return item
+    if settings.ITEM_CREATE_BATCHING:
+        return await item_create_batcher.create(item_in, current_user.id)
+    return await run_in_threadpool(
+        crud.create_item, session=session, item_in=item_in, owner_id=current_user.id
+    )
+
+
+def _raise_missing_item(session: Session, id: uuid.UUID) -> NoReturn:
+    # Only reached when the ownership-scoped write matched no row
+    if session.get(Item, id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    raise HTTPException(status_code=400, detail="Not enough permissions")
 
 
 @router.put("/{id}", response_model=ItemPublic)
@@ -79,16 +346,14 @@ def update_item(
     """
     Update an item.
     """
-    item = session.get(Item, id)
+    item = crud.update_item(
+        session=session,
+        item_id=id,
+        item_in=item_in,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
     if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    update_dict = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_dict)
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+        _raise_missing_item(session, id)
     return item
 
 
@@ -99,11 +364,150 @@ def delete_item(
     """
     Delete an item.
     """
-    item = session.get(Item, id)
+    deleted = crud.delete_item(
+        session=session,
+        item_id=id,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    if not deleted:
+        _raise_missing_item(session, id)
+    return Message(message="Item deleted successfully")
+
+
+def _read_own_item(session: Session, current_user: User, id: uuid.UUID) -> Item:
+    item = item_loader.get(session, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
-    return Message(message="Item deleted successfully")
+    return item
+
+
+@router.post("/{id}/attachments", response_model=ItemAttachmentPublic)
+async def create_item_attachment(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    storage: StorageDep,
+    id: uuid.UUID,
+    filename: Annotated[str, Query(min_length=1, max_length=255)],
+    content_type: Annotated[str, Header(max_length=255)] = "application/octet-stream",
+    content_length: Annotated[int | None, Header()] = None,
+    content_digest: Annotated[str | None, Header()] = None,
+) -> Any:
+    """
+    Attach a file to an item, sent as the raw request body.
+
+    The body is written to storage as it is received and its SHA-256 computed
+    on the way in, then checked against the sha-256 of a Content-Digest header
+    if there is one.
+    """
+    item = await run_in_threadpool(_read_own_item, session, current_user, id)
+    # Give the connection back to the pool while the body streams in, the
+    # attachment is inserted by a new transaction once the file is stored
+    await run_in_threadpool(session.close)
+    if content_length is not None and content_length > settings.ATTACHMENT_MAX_SIZE:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    try:
+        expected_sha256 = (
+            parse_content_digest(content_digest) if content_digest else None
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Digest")
+    attachment = ItemAttachment(
+        item_id=item.id,
+        owner_id=item.owner_id,
+        filename=filename,
+        content_type=content_type,
+        size=0,
+        sha256="",
+    )
+    key = attachment_key(
+        owner_id=item.owner_id, item_id=item.id, attachment_id=attachment.id
+    )
+    try:
+        attachment.size, attachment.sha256 = await store_upload(
+            storage=storage,
+            key=key,
+            chunks=request.stream(),
+            max_size=settings.ATTACHMENT_MAX_SIZE,
+            expected_sha256=expected_sha256,
+        )
+    except AttachmentTooLargeError:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    except ChecksumMismatchError:
+        raise HTTPException(status_code=400, detail="Checksum mismatch")
+    created = await run_in_threadpool(
+        partial(crud.create_item_attachment, session=session, attachment=attachment)
+    )
+    if created is None:
+        await run_in_threadpool(storage.delete, key)
+        raise HTTPException(status_code=404, detail="Item not found")
+    return created
+
+
+@router.get("/{id}/attachments", response_model=ItemAttachmentsPublic)
+def read_item_attachments(
+    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+) -> Any:
+    """
+    List the attachments of an item.
+    """
+    _read_own_item(session, current_user, id)
+    attachments = crud.read_item_attachments(session=session, item_id=id)
+    return model_response(attachments)
+
+
+@router.api_route(
+    "/{id}/attachments/{attachment_id}",
+    methods=["GET", "HEAD"],
+    response_class=StoredFileResponse,
+    # Not inferred from StoredFileResponse, which takes no status code
+    status_code=200,
+)
+def read_item_attachment(
+    session: SessionDep,
+    current_user: CurrentUser,
+    storage: StorageDep,
+    id: uuid.UUID,
+    attachment_id: uuid.UUID,
+) -> StoredFileResponse:
+    """
+    Download an attachment, with support for Range and conditional requests.
+    """
+    item = _read_own_item(session, current_user, id)
+    attachment = crud.read_item_attachment(
+        session=session, item_id=id, attachment_id=attachment_id
+    )
+    if not attachment or not attachment.created_at:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return StoredFileResponse(
+        storage=storage,
+        key=attachment_key(
+            owner_id=item.owner_id, item_id=item.id, attachment_id=attachment.id
+        ),
+        size=attachment.size,
+        sha256=attachment.sha256,
+        last_modified=attachment.created_at,
+        media_type=attachment.content_type,
+        filename=attachment.filename,
+    )
+
+
+@router.delete("/{id}/attachments/{attachment_id}")
+def delete_item_attachment(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    attachment_id: uuid.UUID,
+) -> Message:
+    """
+    Delete an attachment.
+    """
+    _read_own_item(session, current_user, id)
+    deleted = crud.delete_item_attachment(
+        session=session, item_id=id, attachment_id=attachment_id
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return Message(message="Attachment deleted successfully")
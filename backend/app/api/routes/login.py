@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from app import crud
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.msgpack import MsgpackRoute
 from app.core import security
 from app.core.config import settings
 from app.core.security import get_password_hash
@@ -18,7 +19,7 @@ from app.utils import (
     verify_password_reset_token,
 )
 
-router = APIRouter(tags=["login"])
+router = APIRouter(tags=["login"], route_class=MsgpackRoute)
 
 
 @router.post("/login/access-token")
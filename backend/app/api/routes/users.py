@@ -1,32 +1,41 @@
+import csv
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
+from sqlmodel import col, func, select
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 
-from app import crud
+from app import crud, provisioning
 from app.api.deps import (
+    BatchIds,
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.msgpack import MsgpackRoute
+from app.api.responses import model_response
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
+    UserDeletion,
+    UserDeletionsPublic,
     UserPublic,
     UserRegister,
+    UsersBatch,
+    UsersProvisioned,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
 from app.utils import generate_new_account_email, send_email
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=MsgpackRoute)
 
 
 @router.get(
@@ -34,40 +43,85 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    q: str | None = None,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    after: str | None = None,
+) -> Any:
     """
-    Retrieve users.
+    Retrieve users sorted by email, optionally those whose email or full name
+    contains `q`. Pass the email of the last user of a page as `after` to get
+    the next one.
     """
+    users = crud.read_users_page(
+        session=session,
+        skip=skip,
+        limit=limit,
+        q=q,
+        is_active=is_active,
+        is_superuser=is_superuser,
+        after=after,
+    )
+    return model_response(users)
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+def _delete_user(session: SessionDep, user: User) -> None:
+    if settings.USER_DELETION_MODE == "background":
+        # Purged by the purge_user job of the worker
+        crud.request_user_deletion(session=session, user=user)
+    else:
+        crud.delete_user(session=session, user_id=user.id)
 
-    return UsersPublic(data=users, count=count)
+
+@router.get(
+    "/deletions",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserDeletionsPublic,
+)
+def read_user_deletions(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+    """
+    Retrieve background user deletions and their progress, latest first.
+    """
+    count_statement = select(func.count()).select_from(UserDeletion)
+    count = session.exec(count_statement).one()
+    statement = (
+        select(UserDeletion)
+        .order_by(col(UserDeletion.requested_at).desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    deletions = session.exec(statement).all()
+    return UserDeletionsPublic(data=deletions, count=count)
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+def create_user(
+    *, session: SessionDep, background_tasks: BackgroundTasks, user_in: UserCreate
+) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    try:
+        user = crud.create_user(session=session, user_create=user_in)
+    except crud.EmailAlreadyExistsError:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-
-    user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        # Sent after the response, the email carries the password so it does
+        # not go through the outbox
+        background_tasks.add_task(
+            send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -75,6 +129,87 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+def _provision_users(
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    content: bytes,
+    format: provisioning.UploadFormat,
+) -> UsersProvisioned:
+    try:
+        rows = provisioning.parse_rows(content, format)
+    except (ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="The file could not be read")
+    try:
+        result, created = provisioning.provision_users(session=session, rows=rows)
+    except provisioning.TooManyRowsError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload at most {settings.USER_BULK_MAX_ROWS} rows at once",
+        )
+    if settings.emails_enabled and created:
+        background_tasks.add_task(provisioning.send_new_account_emails, created)
+    return result
+
+
+@router.post(
+    "/bulk",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UsersProvisioned,
+    # The form is read by the route itself, after checking its size
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def provision_users(
+    request: Request,
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    content_length: Annotated[int | None, Header()] = None,
+) -> Any:
+    """
+    Create users from a CSV (with a header row) or NDJSON upload of UserCreate
+    fields, sent as the `file` of a form, reporting the outcome of every row.
+    """
+    # Starlette spools the whole form as soon as it is parsed, so the upload
+    # is refused on its declared length first, which the server enforces
+    if content_length is None:
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    if content_length > settings.USER_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload at most {settings.USER_BULK_MAX_SIZE} bytes at once",
+        )
+    async with request.form(max_files=1) as form:
+        file = form.get("file")
+        if not isinstance(file, StarletteUploadFile):
+            raise HTTPException(status_code=400, detail="Upload a CSV or NDJSON file")
+        name = (file.filename or "").lower()
+        format: provisioning.UploadFormat
+        if file.content_type == "text/csv" or name.endswith(".csv"):
+            format = "csv"
+        elif file.content_type == "application/x-ndjson" or name.endswith(
+            (".ndjson", ".jsonl")
+        ):
+            format = "ndjson"
+        else:
+            raise HTTPException(status_code=400, detail="Upload a CSV or NDJSON file")
+        content = await file.read()
+    return await run_in_threadpool(
+        _provision_users, session, background_tasks, content, format
+    )
+
+
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
@@ -82,19 +217,13 @@ def update_user_me(
     """
     Update own user.
     """
-
-    if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
-        if existing_user and existing_user.id != current_user.id:
-            raise HTTPException(
-                status_code=409, detail="User with this email already exists"
-            )
-    user_data = user_in.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(user_data)
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
-    return current_user
+    try:
+        user = crud.update_user(session=session, db_user=current_user, user_in=user_in)
+    except crud.EmailAlreadyExistsError:
+        raise HTTPException(
+            status_code=409, detail="User with this email already exists"
+        )
+    return user
 
 
 @router.patch("/me/password", response_model=Message)
@@ -134,8 +263,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    _delete_user(session, current_user)
     return Message(message="User deleted successfully")
 
 
@@ -144,17 +272,39 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user_create = UserCreate.model_validate(user_in)
+    try:
+        user = crud.create_user(session=session, user_create=user_create)
+    except crud.EmailAlreadyExistsError:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
-    user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
     return user
 
 
+@router.get(
+    "/batch",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UsersBatch,
+)
+def read_users_batch(session: SessionDep, ids: BatchIds) -> Any:
+    """
+    Get users by ID in one call, sorted into found and missing ones.
+    """
+    requested = list(dict.fromkeys(ids))
+    users = {
+        user.id: user for user in crud.read_users_by_ids(session=session, ids=requested)
+    }
+    batch = UsersBatch.model_construct(found=[], missing=[], forbidden=[])
+    for id in requested:
+        if id in users:
+            batch.found.append(users[id])
+        else:
+            batch.missing.append(id)
+    return model_response(batch)
+
+
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
     user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
@@ -170,6 +320,8 @@ def read_user_by_id(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
+    if not user or user.pending_deletion:
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
@@ -189,38 +341,35 @@ def update_user(
     """
 
     db_user = session.get(User, user_id)
-    if not db_user:
+    if not db_user or db_user.pending_deletion:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
-    if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
-        if existing_user and existing_user.id != user_id:
-            raise HTTPException(
-                status_code=409, detail="User with this email already exists"
-            )
-
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    try:
+        db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    except crud.EmailAlreadyExistsError:
+        raise HTTPException(
+            status_code=409, detail="User with this email already exists"
+        )
     return db_user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
 def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+    session: SessionDep,
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
 ) -> Message:
     """
     Delete a user.
     """
     user = session.get(User, user_id)
-    if not user:
+    if not user or user.pending_deletion:
         raise HTTPException(status_code=404, detail="User not found")
     if user == current_user:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
+    _delete_user(session, user)
     return Message(message="User deleted successfully")
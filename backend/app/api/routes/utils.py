@@ -2,10 +2,13 @@ from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app.api.msgpack import MsgpackRoute
+from app.core.cache import item_list_cache
+from app.core.compression import compression_metrics
+from app.models import CacheStats, CompressionStats, Message
 from app.utils import send_email
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=MsgpackRoute)
 
 
 @router.post(
@@ -18,3 +21,26 @@ router = APIRouter(prefix="/utils", tags=["utils"])
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def cache_stats() -> CacheStats:
+    """
+    Hit ratio and eviction counters of the item listing cache.
+    """
+    return item_list_cache.stats()
+
+
+@router.get(
+    "/compression-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def compression_stats() -> list[CompressionStats]:
+    """
+    Bytes in and out, ratio and CPU time of the response compression, per
+    content coding.
+    """
+    return compression_metrics.stats()
@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import uuid
+from collections.abc import AsyncIterable
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+
+from app import outbox
+from app.core.storage import Storage, get_storage
+
+
+class AttachmentTooLargeError(Exception):
+    pass
+
+
+class ChecksumMismatchError(Exception):
+    pass
+
+
+def attachment_key(
+    *, owner_id: uuid.UUID, item_id: uuid.UUID, attachment_id: uuid.UUID
+) -> str:
+    # Grouped by owner and item, so that deleting them removes a key prefix
+    return f"{owner_id}/{item_id}/{attachment_id}"
+
+
+def parse_content_digest(header: str) -> bytes | None:
+    """
+    SHA-256 of a Content-Digest header (RFC 9530), None if it has no sha-256
+    entry. Raise ValueError if the entry is malformed.
+    """
+    for member in header.split(","):
+        algorithm, _, value = member.partition("=")
+        if algorithm.strip().lower() != "sha-256":
+            continue
+        value = value.strip()
+        if len(value) < 2 or value[0] != ":" or value[-1] != ":":
+            raise ValueError("Digest is not a byte sequence")
+        digest = base64.b64decode(value[1:-1], validate=True)
+        if len(digest) != hashlib.sha256().digest_size:
+            raise ValueError("Digest is not a SHA-256")
+        return digest
+    return None
+
+
+async def store_upload(
+    *,
+    storage: Storage,
+    key: str,
+    chunks: AsyncIterable[bytes],
+    max_size: int,
+    expected_sha256: bytes | None = None,
+) -> tuple[int, str]:
+    """
+    Write an upload to `key` chunk by chunk as it is received, returning its
+    size and hex SHA-256.
+
+    The file is only committed once complete. It is discarded, raising
+    AttachmentTooLargeError or ChecksumMismatchError, if it grows past
+    `max_size` or if its SHA-256 is not `expected_sha256`.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    writer = await run_in_threadpool(storage.open_writer, key)
+
+    def write(chunk: bytes) -> None:
+        # hashlib releases the GIL on large chunks, like the file writes
+        sha256.update(chunk)
+        writer.write(chunk)
+
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_size:
+                raise AttachmentTooLargeError
+            await run_in_threadpool(write, chunk)
+        if expected_sha256 is not None and sha256.digest() != expected_sha256:
+            raise ChecksumMismatchError
+        await run_in_threadpool(writer.commit)
+    except Exception:
+        await run_in_threadpool(writer.abort)
+        raise
+    return size, sha256.hexdigest()
+
+
+# Files outlive their rows, which are deleted by the cascade of their item or
+# user; the outbox events of the deletions remove them.
+
+
+@outbox.register("attachment.deleted")
+def delete_attachment_file(_topic: str, payload: dict[str, Any]) -> None:
+    get_storage().delete(
+        attachment_key(
+            owner_id=payload["owner_id"],
+            item_id=payload["item_id"],
+            attachment_id=payload["id"],
+        )
+    )
+
+
+@outbox.register("item.deleted")
+def delete_item_files(_topic: str, payload: dict[str, Any]) -> None:
+    get_storage().delete_prefix(f"{payload['owner_id']}/{payload['id']}/")
+
+
+@outbox.register("user.deleted")
+def delete_user_files(_topic: str, payload: dict[str, Any]) -> None:
+    get_storage().delete_prefix(f"{payload['id']}/")
@@ -0,0 +1,97 @@
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K")
+R = TypeVar("R")
+
+
+@dataclass(eq=False)
+class Pending(Generic[K, R]):
+    key: K
+    future: Future[R] = field(default_factory=Future)
+
+
+class MicroBatcher(ABC, Generic[K, R]):
+    """
+    Thread processing the keys submitted concurrently in batches.
+
+    A batch is collected for at most `max_delay` seconds after its first key,
+    or until it has `batch_size` keys, then given to `process`, which sets the
+    future of every key of the batch. The thread is started by the first
+    submission.
+    """
+
+    def __init__(self, *, name: str, batch_size: int, max_delay: float) -> None:
+        self.name = name
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue: queue.SimpleQueue[Pending[K, R] | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, key: K) -> Future[R]:
+        pending: Pending[K, R] = Pending(key)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            self._queue.put(pending)
+        return pending.future
+
+    def close(self) -> None:
+        """
+        Process the pending keys and stop the thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    @abstractmethod
+    def process(self, batch: Sequence[Pending[K, R]]) -> None: ...
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            closed = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    closed = True
+                    break
+                batch.append(pending)
+            # Keys given up by their caller, cancelled on disconnect, are dropped
+            batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    self.process(batch)
+                except Exception as e:
+                    logger.exception(f"Processing a batch of {self.name} failed")
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+            if closed:
+                return
@@ -0,0 +1,278 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from app.core.config import settings
+from app.models import CacheStats, ItemsPublic, ItemTagsPublic
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Namespace holding pages that span every owner (superuser listings)
+ALL_OWNERS = "*"
+
+
+@dataclass
+class _Entry(Generic[T]):
+    value: T
+    stored_at: float
+
+
+class SharedStore:
+    """
+    SQLite file shared by the worker processes of one host.
+
+    It carries the per-namespace generation counters, so an invalidation in one
+    worker is seen by all of them, and a second level of serialized payloads.
+    """
+
+    def __init__(self, path: str, maxsize: int) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation "
+            "(namespace TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entry "
+            "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload BLOB NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_entry_stored_at ON entry (stored_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def generation(self, namespace: str) -> int:
+        row = (
+            self._conn()
+            .execute("SELECT value FROM generation WHERE namespace = ?", (namespace,))
+            .fetchone()
+        )
+        return int(row[0]) if row else 0
+
+    def bump(self, namespace: str) -> None:
+        self._conn().execute(
+            "INSERT INTO generation (namespace, value) VALUES (?, 1) "
+            "ON CONFLICT (namespace) DO UPDATE SET value = value + 1",
+            (namespace,),
+        )
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        row = (
+            self._conn()
+            .execute("SELECT payload, stored_at FROM entry WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, payload: bytes, stored_at: float) -> int:
+        """Store a payload, returning how many old entries were evicted."""
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entry (key, stored_at, payload) VALUES (?, ?, ?)",
+            (key, stored_at, payload),
+        )
+        cursor = conn.execute(
+            "DELETE FROM entry WHERE key IN (SELECT key FROM entry "
+            "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+        return max(cursor.rowcount, 0)
+
+
+class ResponseCache(Generic[T]):
+    """
+    Read-through LRU cache with TTL and stale-while-revalidate.
+
+    Keys live in namespaces (one per owner), every namespace has a generation
+    counter that is part of the key, so invalidating a namespace is a single
+    counter bump and the old entries simply age out of the LRU.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float,
+        dumps: Callable[[T], bytes],
+        loads: Callable[[bytes], T],
+        shared_path: str | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._dumps = dumps
+        self._loads = loads
+        self._entries: OrderedDict[Hashable, _Entry[T]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="cache-refresh"
+        )
+        self._shared = SharedStore(shared_path, maxsize) if shared_path else None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def _generation(self, namespace: str) -> int:
+        if self._shared is not None:
+            return self._shared.generation(namespace)
+        return self._generations.get(namespace, 0)
+
+    def _lookup(self, full_key: Hashable, now: float) -> _Entry[T] | None:
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                self._entries.move_to_end(full_key)
+                return entry
+        if self._shared is None:
+            return None
+        stored = self._shared.get(repr(full_key))
+        if stored is None or now - stored[1] > self.ttl + self.stale_ttl:
+            return None
+        entry = _Entry(self._loads(stored[0]), stored[1])
+        self._store(full_key, entry, shared=False)
+        return entry
+
+    def _store(self, full_key: Hashable, entry: _Entry[T], *, shared: bool) -> None:
+        with self._lock:
+            self._entries[full_key] = entry
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if shared and self._shared is not None:
+            evicted = self._shared.set(
+                repr(full_key), self._dumps(entry.value), entry.stored_at
+            )
+            with self._lock:
+                self.evictions += evicted
+
+    def _load(self, full_key: Hashable, loader: Callable[[], T]) -> T:
+        value = loader()
+        self._store(full_key, _Entry(value, time.time()), shared=True)
+        return value
+
+    def _refresh(self, full_key: Hashable, loader: Callable[[], T]) -> None:
+        try:
+            self._load(full_key, loader)
+            with self._lock:
+                self.refreshes += 1
+        except Exception:
+            logger.exception("Background cache refresh failed")
+        finally:
+            with self._lock:
+                self._refreshing.discard(full_key)
+
+    def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        load: Callable[[], T],
+        refresh: Callable[[], T] | None = None,
+    ) -> T:
+        """
+        Return the cached value for `key`, calling `load` on a miss.
+
+        Expired entries still inside the stale window are returned as they are
+        while `refresh` (which must not depend on the caller's request state)
+        reloads them in the background.
+        """
+        if not self.enabled:
+            return load()
+        # The generation is read before loading, so a page loaded while a
+        # write commits is stored under the old generation and never served.
+        full_key = (namespace, self._generation(namespace), key)
+        now = time.time()
+        entry = self._lookup(full_key, now)
+        if entry is not None:
+            age = now - entry.stored_at
+            if age <= self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return entry.value
+            if age <= self.ttl + self.stale_ttl:
+                with self._lock:
+                    self.stale_hits += 1
+                    schedule = full_key not in self._refreshing
+                    if schedule:
+                        self._refreshing.add(full_key)
+                if schedule:
+                    self._executor.submit(self._refresh, full_key, refresh or load)
+                return entry.value
+        with self._lock:
+            self.misses += 1
+        return self._load(full_key, load)
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Drop every entry of the given namespaces. Call it after the commit."""
+        for namespace in namespaces:
+            if self._shared is not None:
+                self._shared.bump(namespace)
+            else:
+                with self._lock:
+                    self._generations[namespace] = (
+                        self._generations.get(namespace, 0) + 1
+                    )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return CacheStats(
+                size=len(self._entries),
+                maxsize=self.maxsize,
+                hits=self.hits,
+                stale_hits=self.stale_hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                refreshes=self.refreshes,
+                hit_ratio=(self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            )
+
+
+item_list_cache: ResponseCache[ItemsPublic] = ResponseCache(
+    maxsize=settings.ITEMS_CACHE_MAX_ENTRIES,
+    ttl=settings.ITEMS_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ITEMS_CACHE_STALE_SECONDS,
+    dumps=lambda page: page.model_dump_json().encode(),
+    loads=ItemsPublic.model_validate_json,
+    shared_path=settings.ITEMS_CACHE_SHARED_PATH,
+    enabled=settings.ITEMS_CACHE_ENABLED,
+)
+
+item_tags_cache: ResponseCache[ItemTagsPublic] = ResponseCache(
+    maxsize=settings.ITEMS_CACHE_MAX_ENTRIES,
+    ttl=settings.ITEMS_CACHE_TTL_SECONDS,
+    stale_ttl=settings.ITEMS_CACHE_STALE_SECONDS,
+    dumps=lambda tags: tags.model_dump_json().encode(),
+    loads=ItemTagsPublic.model_validate_json,
+    shared_path=settings.ITEMS_CACHE_SHARED_PATH,
+    enabled=settings.ITEMS_CACHE_ENABLED,
+)
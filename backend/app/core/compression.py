@@ -0,0 +1,273 @@
+import threading
+import time
+import zlib
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.models import CompressionStats
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH))
+
+
+# Compressors by content coding, in order of preference when the client
+# accepts several with the same quality
+ENCODINGS: dict[str, Callable[[], Compressor]] = {
+    "zstd": lambda: _ZstdCompressor(level=3),
+    "br": lambda: _BrotliCompressor(quality=4),
+    "gzip": lambda: _GzipCompressor(level=6),
+}
+
+
+def negotiate(accept_encoding: str, available: list[str]) -> str | None:
+    """
+    Pick the content coding of `available` with the highest quality in the
+    Accept-Encoding header, the first of `available` on a tie.
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+@dataclass
+class _Counters:
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+
+class CompressionMetrics:
+    """
+    Bytes in and out and CPU time spent compressing, per content coding.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, _Counters] = defaultdict(_Counters)
+
+    def count_response(self, encoding: str) -> None:
+        with self._lock:
+            self._counters[encoding].responses += 1
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu: float) -> None:
+        with self._lock:
+            counters = self._counters[encoding]
+            counters.bytes_in += bytes_in
+            counters.bytes_out += bytes_out
+            counters.cpu_seconds += cpu
+
+    def stats(self) -> list[CompressionStats]:
+        with self._lock:
+            return [
+                CompressionStats(
+                    encoding=encoding,
+                    responses=counters.responses,
+                    bytes_in=counters.bytes_in,
+                    bytes_out=counters.bytes_out,
+                    ratio=(
+                        counters.bytes_in / counters.bytes_out
+                        if counters.bytes_out
+                        else 0.0
+                    ),
+                    cpu_seconds=counters.cpu_seconds,
+                )
+                for encoding, counters in sorted(self._counters.items())
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+compression_metrics = CompressionMetrics()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best content coding accepted by the client,
+    among zstd, brotli and gzip.
+
+    A response sent in a single body message is compressed whole, unless it is
+    smaller than `minimum_size`. A streamed response is compressed chunk by
+    chunk and flushed after each one, so server-sent events are not held back.
+    Responses that already carry a Content-Encoding, that serve byte ranges or
+    whose body is not sent in body messages are left untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        encodings: dict[str, Callable[[], Compressor]] | None = None,
+        metrics: CompressionMetrics = compression_metrics,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = ENCODINGS if encodings is None else encodings
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), list(self.encodings)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._compressor: Compressor | None = None
+        self._passthrough = False
+
+    def _run(self, step: Callable[..., bytes], *args: Any) -> bytes:
+        start = time.thread_time()
+        output = step(*args)
+        self.middleware.metrics.record(
+            self.encoding,
+            sum(len(arg) for arg in args),
+            len(output),
+            time.thread_time() - start,
+        )
+        return output
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            # Byte ranges are offsets into the uncompressed content
+            self._passthrough = any(
+                name in headers
+                for name in ("content-encoding", "content-range", "accept-ranges")
+            )
+            if self._passthrough:
+                self._start = None
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            if self._start is not None:
+                # Sent through an extension such as http.response.pathsend
+                start, self._start = self._start, None
+                self._passthrough = True
+                await self._send(start)
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self._start is not None:
+            start, self._start = self._start, None
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            self._compressor = self.middleware.encodings[self.encoding]()
+            self.middleware.metrics.count_response(self.encoding)
+            if not more_body:
+                body = self._run(self._compressor.compress, body) + self._run(
+                    self._compressor.finish
+                )
+                headers["Content-Length"] = str(len(body))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            await self._send(start)
+
+        assert self._compressor is not None
+        chunk = self._run(self._compressor.compress, body)
+        chunk += self._run(
+            self._compressor.flush if more_body else self._compressor.finish
+        )
+        await self._send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
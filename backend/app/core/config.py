@@ -54,7 +54,7 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = ""
 
-    @computed_field  
+    @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
         return PostgresDsn.build(
@@ -88,6 +88,102 @@ class Settings(BaseSettings):
     def emails_enabled(self) -> bool:
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
+    # Per-owner cache of item listing pages. Writes only invalidate the cache
+    # of their own worker unless ITEMS_CACHE_SHARED_PATH is set, so leave it
+    # off when running several workers without it
+    ITEMS_CACHE_ENABLED: bool = False
+    ITEMS_CACHE_MAX_ENTRIES: int = 10_000
+    ITEMS_CACHE_TTL_SECONDS: float = 30.0
+    ITEMS_CACHE_STALE_SECONDS: float = 30.0
+    # SQLite file shared by the workers of one host, in-process only if unset
+    ITEMS_CACHE_SHARED_PATH: str | None = None
+
+    # Responses are compressed with zstd, brotli or gzip as the client accepts,
+    # unless sent whole and smaller than the minimum size
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # Bulk user provisioning: rows and bytes accepted per upload, users
+    # inserted per statement, and threads hashing passwords. The passwords are
+    # hashed within the request, at a few per second per thread, so the rows
+    # are capped to what a request can hash without starving the others
+    USER_BULK_MAX_ROWS: int = 100
+    USER_BULK_MAX_SIZE: int = 1024**2
+    USER_BULK_BATCH_SIZE: int = 500
+    USER_BULK_HASH_WORKERS: int = 2
+
+    # Ids accepted by one call of the batch fetch endpoints
+    BATCH_FETCH_MAX_IDS: int = 100
+
+    # Where item attachments are stored: "local" files under STORAGE_LOCAL_PATH
+    # or "s3" objects of S3_BUCKET, credentials coming from the usual AWS
+    # variables. S3_ENDPOINT_URL points to another S3-compatible store.
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    STORAGE_LOCAL_PATH: str = "data/attachments"
+    S3_BUCKET: str = "attachments"
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    # Largest attachment accepted, in bytes
+    ATTACHMENT_MAX_SIZE: int = 100 * 1024**2
+
+    # How list endpoints count all rows in the same round trip as the page:
+    # "pipeline" sends both queries at once in psycopg pipeline mode, "window"
+    # adds count(*) OVER () to the page query
+    LIST_COUNT_MODE: Literal["pipeline", "window"] = "pipeline"
+
+    # "background" deactivates the user at once and purges its items in batches
+    USER_DELETION_MODE: Literal["immediate", "background"] = "immediate"
+    USER_PURGE_BATCH_SIZE: int = 1000
+    USER_PURGE_BATCH_PAUSE_SECONDS: float = 0.05
+
+    # Group commit of item creations: concurrent creations are inserted together
+    # by one transaction, of at most ITEM_CREATE_BATCH_SIZE items collected
+    # for up to ITEM_CREATE_BATCH_DELAY_SECONDS after the first one
+    ITEM_CREATE_BATCHING: bool = False
+    ITEM_CREATE_BATCH_SIZE: int = 100
+    ITEM_CREATE_BATCH_DELAY_SECONDS: float = 0.002
+
+    # Lookups of users and items by id made concurrently by the requests of a
+    # worker are read by one query, collected like the item creations above
+    ENTITY_LOOKUP_BATCHING: bool = False
+    ENTITY_LOOKUP_BATCH_SIZE: int = 100
+    ENTITY_LOOKUP_BATCH_DELAY_SECONDS: float = 0.001
+
+    # Item changes younger than this are re-sent by the next delta sync instead
+    # of moving the watermark past transactions that may still commit
+    ITEM_SYNC_SAFETY_WINDOW_SECONDS: float = 5.0
+    # Most changes returned by one delta sync
+    ITEM_SYNC_MAX_LIMIT: int = 1000
+    # Tombstones of deleted items older than this are pruned by the purge, in
+    # batches of ITEM_TOMBSTONE_PRUNE_BATCH_SIZE: delta syncs from an older
+    # watermark are refused and must reload every item
+    ITEM_TOMBSTONE_RETENTION_DAYS: int = 30
+    ITEM_TOMBSTONE_PRUNE_BATCH_SIZE: int = 1000
+
+    # Live item streams held open by one worker, and the changes buffered per
+    # stream before it is told to resync
+    ITEMS_STREAM_MAX_SUBSCRIBERS: int = 500
+    ITEMS_STREAM_QUEUE_SIZE: int = 1000
+    ITEMS_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Outbox relay: events dispatched per transaction, idle polling interval,
+    # and retries of a failing event, doubling the delay after each attempt
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_DELAY_SECONDS: float = 1.0
+    # Modules imported by the relay, registering handlers with app.outbox.register
+    OUTBOX_HANDLER_MODULES: list[str] = ["app.attachments"]
+
+    # Job queue: worker threads per process, idle polling interval, attempts
+    # of a failing job with a doubling delay between them, and how long a
+    # running job stays invisible before another worker claims it again
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_DELAY_SECONDS: float = 10.0
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = 300.0
+
     EMAIL_TEST_USER: EmailStr = "test@example.com"
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -114,4 +210,4 @@ class Settings(BaseSettings):
         return self
 
 
-settings = Settings()  
+settings = Settings()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+from app.core.config import settings
+from app.models import ItemChangeEvent
+
+logger = logging.getLogger(__name__)
+
+# Channel notified by the item_notify trigger
+CHANNEL = "item_changes"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# (changed at, id) position of a change, as in the delta sync watermark
+Position = tuple[datetime, uuid.UUID]
+Change = tuple[Position, ItemChangeEvent]
+
+
+@dataclass(frozen=True)
+class Resync:
+    """
+    Notification of a statement that changed too many items to list them: the
+    streams of `owner_ids`, of every owner if None, must reload their items.
+    """
+
+    owner_ids: frozenset[uuid.UUID] | None
+
+
+class SubscriberLimitError(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class Subscription:
+    """
+    Queue of the changes visible to one stream, filled from the listener thread.
+
+    A None in the queue asks the stream to resync: notifications may have been
+    lost, because the listener reconnected or the stream fell behind.
+    """
+
+    owner_id: uuid.UUID | None
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue[Change | None] = field(init=False)
+    maxsize: int = 1000
+
+    def __post_init__(self) -> None:
+        self.queue = asyncio.Queue(self.maxsize)
+
+    def _put(self, change: Change | None) -> None:
+        # Runs in the event loop of the stream
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    def deliver(self, change: Change | None) -> None:
+        if change is not None and self.owner_id not in (None, change[1].owner_id):
+            return
+        self.loop.call_soon_threadsafe(self._put, change)
+
+
+class ItemChangeBroker:
+    """
+    Fan-out of item change notifications to the streams of this worker.
+
+    A single connection per worker LISTENs on the channel, started with the
+    first subscription, and every notification is delivered to the subscribers
+    allowed to see it.
+    """
+
+    def __init__(
+        self, *, max_subscribers: int, queue_size: int, reconnect_delay: float = 1.0
+    ) -> None:
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def subscribe(self, owner_id: uuid.UUID | None) -> Subscription:
+        """
+        Subscribe the running event loop to the changes of `owner_id`, of every
+        owner if None. Raise SubscriberLimitError when the worker is full.
+        """
+        subscription = Subscription(
+            owner_id, asyncio.get_running_loop(), maxsize=self.queue_size
+        )
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitError
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._listen, name="item-changes", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, change: Change | None) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            self._deliver(subscription, change)
+
+    def resync(self, owner_ids: frozenset[uuid.UUID] | None) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if (
+                owner_ids is None
+                or subscription.owner_id is None
+                or subscription.owner_id in owner_ids
+            ):
+                self._deliver(subscription, None)
+
+    def _deliver(self, subscription: Subscription, change: Change | None) -> None:
+        try:
+            subscription.deliver(change)
+        except RuntimeError:
+            # The event loop of the stream is closed, it will never unsubscribe
+            self.unsubscribe(subscription)
+
+    def dispatch(self, payload: str) -> None:
+        notification = parse_notification(payload)
+        if isinstance(notification, Resync):
+            self.resync(notification.owner_ids)
+            return
+        for change in notification:
+            self.publish(change)
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _listen(self) -> None:
+        try:
+            self._listen_until_stopped()
+        finally:
+            # A later subscription starts a new listener if this one died
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _listen_until_stopped(self) -> None:
+        connected_before = False
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(
+                    host=settings.POSTGRES_SERVER,
+                    port=settings.POSTGRES_PORT,
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    dbname=settings.POSTGRES_DB,
+                    autocommit=True,
+                ) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    if connected_before:
+                        self.publish(None)
+                    connected_before = True
+                    while not self._stopped.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            try:
+                                self.dispatch(notify.payload)
+                            except Exception:
+                                logger.exception(
+                                    f"Invalid item change notification {notify.payload!r}"
+                                )
+            except Exception:
+                logger.exception("Item change listener disconnected")
+                self._stopped.wait(self.reconnect_delay)
+
+
+def parse_notification(payload: str) -> list[Change] | Resync:
+    """
+    Changes of a notification of the item_notify_* triggers, sent once per
+    statement.
+    """
+    data = json.loads(payload)
+    if "resync" in data:
+        owner_ids = data["resync"]
+        return Resync(
+            None if owner_ids is None else frozenset(map(uuid.UUID, owner_ids))
+        )
+    changes = []
+    for id, owner_id, at in data["changes"]:
+        event = ItemChangeEvent(op=data["op"], id=id, owner_id=owner_id)
+        changes.append(((_EPOCH + timedelta(microseconds=at), event.id), event))
+    return changes
+
+
+item_change_broker = ItemChangeBroker(
+    max_subscribers=settings.ITEMS_STREAM_MAX_SUBSCRIBERS,
+    queue_size=settings.ITEMS_STREAM_QUEUE_SIZE,
+)
@@ -0,0 +1,222 @@
+import functools
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Protocol
+
+from app.core.config import settings
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+
+class StorageWriter(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+    def commit(self) -> None: ...
+
+    def abort(self) -> None: ...
+
+
+class Storage(Protocol):
+    """
+    Store of files by key, keys being "/" separated paths.
+
+    A file is written through a writer, chunk by chunk, and only becomes
+    visible under its key once committed.
+    """
+
+    def open_writer(self, key: str) -> StorageWriter: ...
+
+    def read(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """
+        Iterate over the bytes of the file from `start` up to `end` excluded.
+        """
+        ...
+
+    def local_path(self, key: str) -> Path | None:
+        """
+        Path of the file, if it is on the local filesystem.
+        """
+        ...
+
+    def delete(self, key: str) -> None: ...
+
+    def delete_prefix(self, prefix: str) -> None: ...
+
+
+class _LocalWriter:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        # Written next to the target so that the rename cannot cross devices
+        self._file = tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".part", delete=False
+        )
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def commit(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._file.name, self._path)
+
+    def abort(self) -> None:
+        self._file.close()
+        Path(self._file.name).unlink(missing_ok=True)
+
+
+class LocalStorage:
+    """
+    Files in a directory of the local filesystem.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, root: str | os.PathLike[str]) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if not key or any(part in ("", ".", "..") for part in key.split("/")):
+            raise ValueError(f"Invalid storage key {key!r}")
+        return self.root.joinpath(*key.split("/"))
+
+    def open_writer(self, key: str) -> StorageWriter:
+        return _LocalWriter(self._path(key))
+
+    def read(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        with self._path(key).open("rb") as file:
+            file.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def local_path(self, key: str) -> Path | None:
+        return self._path(key)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(self._path(prefix.rstrip("/")), ignore_errors=True)
+
+
+class _S3Writer:
+    def __init__(self, storage: "S3Storage", key: str) -> None:
+        self._storage = storage
+        self._key = key
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[dict[str, Any]] = []
+
+    def _upload_part(self) -> None:
+        client, bucket = self._storage.client, self._storage.bucket
+        if self._upload_id is None:
+            upload = client.create_multipart_upload(Bucket=bucket, Key=self._key)
+            self._upload_id = upload["UploadId"]
+        number = len(self._parts) + 1
+        part = client.upload_part(
+            Bucket=bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=bytes(self._buffer),
+        )
+        self._parts.append({"PartNumber": number, "ETag": part["ETag"]})
+        self._buffer.clear()
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        if len(self._buffer) >= self._storage.part_size:
+            self._upload_part()
+
+    def commit(self) -> None:
+        client, bucket = self._storage.client, self._storage.bucket
+        if self._upload_id is None:
+            # Small enough for a single request
+            client.put_object(Bucket=bucket, Key=self._key, Body=bytes(self._buffer))
+            return
+        if self._buffer:
+            self._upload_part()
+        client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        self._buffer.clear()
+        if self._upload_id is not None:
+            self._storage.client.abort_multipart_upload(
+                Bucket=self._storage.bucket, Key=self._key, UploadId=self._upload_id
+            )
+
+
+class S3Storage:
+    """
+    Objects of a bucket of an S3-compatible store, through a boto3 S3 client.
+
+    Files are uploaded in parts of `part_size` bytes, so that at most one part
+    is held in memory; S3 requires parts of at least 5 MiB but the last.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, client: Any, bucket: str, part_size: int = 8 * 1024**2) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.part_size = part_size
+
+    def open_writer(self, key: str) -> StorageWriter:
+        return _S3Writer(self, key)
+
+    def read(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        if end <= start:
+            return
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end - 1}"
+        )
+        yield from response["Body"].iter_chunks(self.chunk_size)
+
+    def local_path(self, key: str) -> Path | None:
+        return None
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects = [{"Key": content["Key"]} for content in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True}
+                )
+
+
+@functools.cache
+def get_storage() -> Storage:
+    """
+    Storage of the attachments, chosen by STORAGE_BACKEND.
+    """
+    if settings.STORAGE_BACKEND == "s3":
+        if boto3 is None:
+            raise RuntimeError("The s3 storage backend needs the s3 extra installed")
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+        )
+        return S3Storage(client, settings.S3_BUCKET)
+    return LocalStorage(settings.STORAGE_LOCAL_PATH)
@@ -1,38 +1,391 @@
 import uuid
-from typing import Any
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, Literal, TypeVar
 
-from sqlmodel import Session, select
+from sqlalchemy import (
+    CTE,
+    ColumnElement,
+    Insert,
+    Select,
+    String,
+    Uuid,
+    any_,
+    bindparam,
+    or_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from sqlmodel import (
+    Session,
+    SQLModel,
+    case,
+    col,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+    update,
+)
 
+from app.core.cache import ALL_OWNERS, item_list_cache, item_tags_cache
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    JOB_DEAD,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    Item,
+    ItemAttachment,
+    ItemAttachmentPublic,
+    ItemAttachmentsPublic,
+    ItemChanges,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemTagCount,
+    ItemTagsPublic,
+    ItemTombstone,
+    ItemUpdate,
+    Job,
+    OutboxEvent,
+    User,
+    UserCreate,
+    UserDeletion,
+    UserPublic,
+    UsersPublic,
+    UserUpdate,
+    UserUpdateMe,
+)
+
+M = TypeVar("M", bound=SQLModel)
+
+# Unique index on lower(email), see User
+_EMAIL_INDEX = "ix_user_email_lower"
+# Foreign key of ItemAttachment to its item
+_ATTACHMENT_ITEM_FOREIGN_KEY = "itemattachment_item_id_owner_id_fkey"
+
+
+class EmailAlreadyExistsError(Exception):
+    pass
+
+
+class UnindexedItemQueryError(Exception):
+    pass
+
+
+# Writes use INSERT/UPDATE/DELETE ... RETURNING, so the persisted row comes back
+# with the write itself instead of a refresh SELECT after the commit. Sessions
+# should be created with expire_on_commit=False to keep the returned objects
+# loaded after the commit.
+#
+# Changes are published through the outbox: the event rows are inserted by the
+# same statement as the change, in a data-modifying CTE.
+
+_USER_EVENT_FIELDS = ("id", "email", "full_name", "is_active", "is_superuser")
+_ITEM_EVENT_FIELDS = ("id", "owner_id", "title", "description", "tags", "updated_at")
+
+
+def _outbox_event(topic: str, changed: CTE, *fields: str) -> Insert:
+    """
+    Insert an outbox event for every row of `changed`, with the given columns
+    of the row as payload.
+    """
+    payload = func.jsonb_build_object(
+        *(arg for name in fields for arg in (literal(name), changed.c[name]))
+    )
+    return insert(OutboxEvent).from_select(
+        ["topic", "payload"],
+        select(literal(topic), payload).select_from(changed),
+        # Python defaults are not bound inside a CTE, the server defaults apply
+        include_defaults=False,
+    )
+
+
+def select_public(table: type[SQLModel], model: type[SQLModel]) -> Select[Any]:
+    """
+    Select the columns of `table` that make up the public `model`, in the order
+    expected by `read_models`.
+    """
+    statement: Select[Any] = select(
+        *(getattr(table, name) for name in model.model_fields)
+    )
+    return statement
+
+
+def _construct_all(model: type[M], rows: Iterable[Sequence[Any]]) -> list[M]:
+    fields = tuple(model.model_fields)
+    return [
+        model.model_construct(**dict(zip(fields, row, strict=True))) for row in rows
+    ]
+
+
+def read_models(*, session: Session, model: type[M], statement: Select[Any]) -> list[M]:
+    """
+    Run a read-only `select_public` statement and build `model` from each row.
+
+    The statement runs on the connection of the session, without ORM entities,
+    identity map or change tracking, and the models are built without
+    validation: the rows come typed from the database.
+    """
+    return _construct_all(model, session.connection().execute(statement))
+
+
+def fetch_pipelined(
+    *, session: Session, statements: Sequence[Select[Any]]
+) -> list[list[tuple[Any, ...]]]:
+    """
+    Run read-only statements in a single network round trip with the pipeline
+    mode of psycopg, returning the rows of each.
+
+    The statements go straight to the driver: the rows are tuples of the
+    driver's types, without SQLAlchemy result processing, and they are not
+    seen by the SQLAlchemy execution events.
+    """
+    connection = session.connection()
+    compiled = [
+        statement.compile(
+            dialect=connection.dialect,
+            compile_kwargs={"render_postcompile": True},
+        )
+        for statement in statements
+    ]
+    driver_connection = connection.connection.driver_connection
+    assert driver_connection is not None
+    with driver_connection.pipeline():
+        cursors = [driver_connection.execute(c.string, c.params) for c in compiled]
+    return [cursor.fetchall() for cursor in cursors]
+
+
+def read_models_page(
+    *,
+    session: Session,
+    model: type[M],
+    statement: Select[Any],
+    skip: int,
+    limit: int,
+    order_by: Sequence[ColumnElement[Any]] = (),
+    after: ColumnElement[bool] | None = None,
+) -> tuple[list[M], int]:
+    """
+    Read a page of a `select_public` statement along with the count of all its
+    rows, in a single round trip chosen by LIST_COUNT_MODE.
+
+    The page is sorted by `order_by` and, for keyset pagination, restricted
+    to the rows matching `after`, which the count ignores.
+    """
+    count_statement = select(func.count()).select_from(statement.subquery())
+    page_statement = statement if after is None else statement.where(after)
+    page_statement = page_statement.order_by(*order_by).offset(skip).limit(limit)
+    if settings.LIST_COUNT_MODE == "pipeline":
+        counts, rows = fetch_pipelined(
+            session=session, statements=[count_statement, page_statement]
+        )
+        return _construct_all(model, rows), counts[0][0]
+    connection = session.connection()
+    if after is not None:
+        # count(*) OVER () would not see the rows before the cursor
+        count = connection.execute(count_statement).scalar_one()
+        return _construct_all(model, connection.execute(page_statement)), count
+    # count(*) OVER () is computed before OFFSET and LIMIT apply
+    page_statement = page_statement.add_columns(func.count().over())
+    counted_rows = connection.execute(page_statement).all()
+    if not counted_rows:
+        # Past the last page there is no row to carry the count
+        count = connection.execute(count_statement).scalar_one() if skip else 0
+        return [], count
+    return (
+        _construct_all(model, (row[:-1] for row in counted_rows)),
+        counted_rows[0][-1],
+    )
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
+    """
+    Insert a user, raising EmailAlreadyExistsError if its email is taken.
+
+    A taken email is rejected before hashing the password. The insert still
+    checks it with ON CONFLICT DO NOTHING, so concurrent signups with the same
+    email cannot both pass the prior check.
+    """
+    if read_taken_emails(session=session, emails=[user_create.email]):
+        raise EmailAlreadyExistsError
     db_obj = User.model_validate(
         user_create, update={"hashed_password": get_password_hash(user_create.password)}
     )
-    session.add(db_obj)
+    created = (
+        pg_insert(User)
+        .values(**db_obj.model_dump())
+        .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+        .returning(User)
+        .cte("created")
+    )
+    statement = select(aliased(User, created)).add_cte(
+        _outbox_event("user.created", created, *_USER_EVENT_FIELDS).cte("event")
+    )
+    user = session.scalars(statement).one_or_none()
+    session.commit()
+    if user is None:
+        raise EmailAlreadyExistsError
+    return user
+
+
+def read_taken_emails(*, session: Session, emails: Sequence[str]) -> set[str]:
+    """
+    Return the lowercased `emails` that are already used by a user.
+    """
+    lowered = [email.lower() for email in emails]
+    statement = select(func.lower(User.email)).where(
+        func.lower(User.email)
+        == any_(bindparam("emails", lowered, type_=ARRAY(String)))
+    )
+    return set(session.exec(statement).all())
+
+
+def create_users(*, session: Session, users: Sequence[User]) -> list[User]:
+    """
+    Insert users with hashed passwords in one statement, returning those that
+    were inserted: a user whose email is taken is skipped.
+    """
+    created = (
+        pg_insert(User)
+        .values([user.model_dump() for user in users])
+        .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+        .returning(User)
+        .cte("created")
+    )
+    statement = select(aliased(User, created)).add_cte(
+        _outbox_event("user.created", created, *_USER_EVENT_FIELDS).cte("event")
+    )
+    inserted = list(session.scalars(statement).all())
     session.commit()
-    session.refresh(db_obj)
-    return db_obj
+    return inserted
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+def update_user(
+    *, session: Session, db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> Any:
+    """
+    Update a user, raising EmailAlreadyExistsError if its new email is taken.
+    """
     user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
     if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
-    db_user.sqlmodel_update(user_data, update=extra_data)
-    session.add(db_user)
+        password = user_data.pop("password")
+        user_data["hashed_password"] = get_password_hash(password)
+    if not user_data:
+        return db_user
+    updated = (
+        update(User)
+        .where(col(User.id) == db_user.id)
+        .values(**user_data)
+        .returning(User)
+        .cte("updated")
+    )
+    statement = (
+        select(aliased(User, updated))
+        .add_cte(
+            _outbox_event("user.updated", updated, *_USER_EVENT_FIELDS).cte("event")
+        )
+        # Refresh the instance if it is already in the session
+        .execution_options(populate_existing=True)
+    )
+    try:
+        user = session.scalars(statement).one()
+    except IntegrityError as e:
+        session.rollback()
+        if _violated_constraint(e) == _EMAIL_INDEX:
+            raise EmailAlreadyExistsError from e
+        raise
     session.commit()
-    session.refresh(db_user)
-    return db_user
+    return user
+
+
+def _violated_constraint(error: IntegrityError) -> str | None:
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
+
+def request_user_deletion(*, session: Session, user: User) -> None:
+    """
+    Deactivate and hide a user, recording a deletion and queuing the
+    purge_user job that deletes its items.
+    """
+    statement = (
+        update(User)
+        .where(col(User.id) == user.id)
+        .values(is_active=False, pending_deletion=True)
+    )
+    session.exec(statement)  # type: ignore
+    session.exec(insert(UserDeletion).values(user_id=user.id, email=user.email))  # type: ignore
+    event = insert(OutboxEvent).values(
+        topic="user.deleted", payload={"id": str(user.id), "email": user.email}
+    )
+    session.exec(event)  # type: ignore
+    enqueue_job(session=session, task="purge_user", payload={"user_id": str(user.id)})
+    session.commit()
+    invalidate_item_lists(owner_id=user.id)
+
+
+def delete_user(*, session: Session, user_id: uuid.UUID) -> None:
+    """
+    Delete a user at once, its items are deleted by the database cascade.
+    """
+    deleted = (
+        delete(User)
+        .where(col(User.id) == user_id)
+        .returning(col(User.id), col(User.email))
+        .cte("deleted")
+    )
+    session.exec(_outbox_event("user.deleted", deleted, "id", "email"))  # type: ignore
+    session.commit()
+    invalidate_item_lists(owner_id=user_id)
+
+
+def delete_user_items_batch(
+    *, session: Session, user_id: uuid.UUID, batch_size: int
+) -> int:
+    """
+    Delete up to `batch_size` items of a user pending deletion in one short
+    transaction, returning how many were deleted.
+    """
+    batch = select(Item.id).where(Item.owner_id == user_id).limit(batch_size)
+    statement = delete(Item).where(
+        col(Item.owner_id) == user_id, col(Item.id).in_(batch.scalar_subquery())
+    )
+    result = session.exec(statement)  # type: ignore
+    deleted: int = result.rowcount
+    progress = (
+        update(UserDeletion)
+        .where(col(UserDeletion.user_id) == user_id)
+        .values(items_deleted=UserDeletion.items_deleted + deleted)
+    )
+    session.exec(progress)  # type: ignore
+    session.commit()
+    return deleted
+
+
+def complete_user_deletion(*, session: Session, user_id: uuid.UUID) -> None:
+    """
+    Delete the row of a purged user and mark its deletion as completed.
+    """
+    session.exec(delete(User).where(col(User.id) == user_id))  # type: ignore
+    statement = (
+        update(UserDeletion)
+        .where(col(UserDeletion.user_id) == user_id)
+        .values(completed_at=func.now())
+    )
+    session.exec(statement)  # type: ignore
+    session.commit()
+    invalidate_item_lists(owner_id=user_id)
 
 
 def get_user_by_email(*, session: Session, email: str) -> User | None:
-    statement = select(User).where(User.email == email)
+    # Both sides are lowered by the database, matching ix_user_email_lower
+    statement = select(User).where(func.lower(User.email) == func.lower(email))
     session_user = session.exec(statement).first()
     return session_user
 
@@ -47,8 +400,592 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
 
 
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
-    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
-    session.add(db_item)
+    return create_items(session=session, items=[(item_in, owner_id)])[0]
+
+
+def create_items(
+    *, session: Session, items: Sequence[tuple[ItemCreate, uuid.UUID]]
+) -> list[Item]:
+    """
+    Create the (item, owner id) `items` with a single multi-row INSERT and
+    commit, returning them in the same order.
+    """
+    db_items = [
+        Item.model_validate(item_in, update={"owner_id": owner_id})
+        for item_in, owner_id in items
+    ]
+    # created_at/updated_at are left out so they get their server default
+    created = (
+        insert(Item)
+        .values(
+            [
+                db_item.model_dump(exclude={"created_at", "updated_at"})
+                for db_item in db_items
+            ]
+        )
+        .returning(Item)
+        .cte("created")
+    )
+    statement = select(aliased(Item, created)).add_cte(
+        _outbox_event("item.created", created, *_ITEM_EVENT_FIELDS).cte("event")
+    )
+    # RETURNING does not keep the order of the VALUES
+    created_items = {item.id: item for item in session.scalars(statement)}
+    session.commit()
+    for owner_id in {owner_id for _, owner_id in items}:
+        invalidate_item_lists(owner_id=owner_id)
+    return [created_items[db_item.id] for db_item in db_items]
+
+
+def update_item(
+    *,
+    session: Session,
+    item_id: uuid.UUID,
+    item_in: ItemUpdate,
+    owner_id: uuid.UUID | None,
+) -> Item | None:
+    """
+    Update an item, restricted to the items of `owner_id` unless it is None.
+
+    Return None if no item matched, without telling apart a missing item from
+    one of another owner.
+    """
+    conditions = [col(Item.id) == item_id]
+    if owner_id is not None:
+        conditions.append(col(Item.owner_id) == owner_id)
+    update_data = item_in.model_dump(exclude_unset=True)
+    if not update_data:
+        return session.exec(select(Item).where(*conditions)).first()
+    updated = (
+        update(Item)
+        .where(*conditions)
+        .values(**update_data)
+        .returning(Item)
+        .cte("updated")
+    )
+    statement = (
+        select(aliased(Item, updated))
+        .add_cte(
+            _outbox_event("item.updated", updated, *_ITEM_EVENT_FIELDS).cte("event")
+        )
+        # Refresh the instance if it is already in the session
+        .execution_options(populate_existing=True)
+    )
+    item = session.scalars(statement).one_or_none()
+    session.commit()
+    if item:
+        invalidate_item_lists(owner_id=item.owner_id)
+    return item
+
+
+def delete_item(
+    *, session: Session, item_id: uuid.UUID, owner_id: uuid.UUID | None
+) -> bool:
+    """
+    Delete an item, restricted to the items of `owner_id` unless it is None.
+
+    The tombstone for delta syncs is inserted by the same statement as the
+    outbox event.
+    """
+    statement = delete(Item).where(col(Item.id) == item_id)
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    deleted = statement.returning(col(Item.id), col(Item.owner_id)).cte("deleted")
+    tombstone = (
+        insert(ItemTombstone)
+        .from_select(["item_id", "owner_id"], select(deleted.c.id, deleted.c.owner_id))
+        .returning(col(ItemTombstone.owner_id))
+        .add_cte(_outbox_event("item.deleted", deleted, "id", "owner_id").cte("event"))
+    )
+    deleted_owner_id = session.scalars(tombstone).first()
+    session.commit()
+    if deleted_owner_id is None:
+        return False
+    invalidate_item_lists(owner_id=deleted_owner_id)
+    return True
+
+
+_ATTACHMENT_EVENT_FIELDS = ("id", "item_id", "owner_id", "filename", "size", "sha256")
+
+
+def create_item_attachment(
+    *, session: Session, attachment: ItemAttachment
+) -> ItemAttachment | None:
+    """
+    Insert the row of a stored attachment, returning None if its item has been
+    deleted meanwhile.
+    """
+    created = (
+        insert(ItemAttachment)
+        .values(**attachment.model_dump(exclude_none=True))
+        .returning(ItemAttachment)
+        .cte("created")
+    )
+    statement = select(aliased(ItemAttachment, created)).add_cte(
+        _outbox_event("attachment.created", created, *_ATTACHMENT_EVENT_FIELDS).cte(
+            "event"
+        )
+    )
+    try:
+        created_attachment = session.scalars(statement).one()
+    except IntegrityError as e:
+        session.rollback()
+        if _violated_constraint(e) == _ATTACHMENT_ITEM_FOREIGN_KEY:
+            return None
+        raise
+    session.commit()
+    return created_attachment
+
+
+def read_item_attachments(
+    *, session: Session, item_id: uuid.UUID
+) -> ItemAttachmentsPublic:
+    """
+    Read the attachments of an item, oldest first.
+    """
+    statement = (
+        select_public(ItemAttachment, ItemAttachmentPublic)
+        .where(col(ItemAttachment.item_id) == item_id)
+        .order_by(col(ItemAttachment.created_at), col(ItemAttachment.id))
+    )
+    attachments = read_models(
+        session=session, model=ItemAttachmentPublic, statement=statement
+    )
+    return ItemAttachmentsPublic.model_construct(
+        data=attachments, count=len(attachments)
+    )
+
+
+def read_item_attachment(
+    *, session: Session, item_id: uuid.UUID, attachment_id: uuid.UUID
+) -> ItemAttachment | None:
+    statement = select(ItemAttachment).where(
+        col(ItemAttachment.id) == attachment_id,
+        col(ItemAttachment.item_id) == item_id,
+    )
+    return session.exec(statement).first()
+
+
+def delete_item_attachment(
+    *, session: Session, item_id: uuid.UUID, attachment_id: uuid.UUID
+) -> bool:
+    """
+    Delete the row of an attachment, its file is deleted by the handler of the
+    outbox event.
+    """
+    deleted = (
+        delete(ItemAttachment)
+        .where(
+            col(ItemAttachment.id) == attachment_id,
+            col(ItemAttachment.item_id) == item_id,
+        )
+        .returning(
+            col(ItemAttachment.id),
+            col(ItemAttachment.item_id),
+            col(ItemAttachment.owner_id),
+        )
+        .cte("deleted")
+    )
+    event = _outbox_event("attachment.deleted", deleted, "id", "item_id", "owner_id")
+    result = session.exec(event.returning(col(OutboxEvent.id)))  # type: ignore
+    found = result.first() is not None
+    session.commit()
+    return found
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_watermark(changed_at: datetime, id: uuid.UUID) -> str:
+    microseconds = (changed_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}-{id.hex}"
+
+
+def decode_watermark(watermark: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Parse a watermark from `encode_watermark`, raising ValueError if invalid.
+    """
+    microseconds, _, id = watermark.partition("-")
+    try:
+        changed_at = _EPOCH + timedelta(microseconds=int(microseconds))
+    except OverflowError as e:
+        raise ValueError(f"Watermark out of range: {watermark}") from e
+    return changed_at, uuid.UUID(hex=id)
+
+
+def prune_item_tombstones_batch(
+    *, session: Session, retention: timedelta, batch_size: int
+) -> int:
+    """
+    Delete up to `batch_size` tombstones older than `retention` in one short
+    transaction, returning how many were deleted.
+    """
+    batch = (
+        select(ItemTombstone.item_id)
+        .where(col(ItemTombstone.deleted_at) < func.now() - literal(retention))
+        .limit(batch_size)
+    )
+    statement = delete(ItemTombstone).where(
+        col(ItemTombstone.item_id).in_(batch.scalar_subquery())
+    )
+    result = session.exec(statement)  # type: ignore
+    deleted: int = result.rowcount
+    session.commit()
+    return deleted
+
+
+def read_item_changes(
+    *,
+    session: Session,
+    owner_id: uuid.UUID | None,
+    since: tuple[datetime, uuid.UUID] | None,
+    limit: int,
+    safety_window: timedelta,
+) -> ItemChanges:
+    """
+    Read the items inserted, updated or deleted after `since` in (changed at,
+    id) order, restricted to the items of `owner_id` unless it is None.
+
+    Writes are timestamped when their transaction starts but become visible
+    when it commits, so the returned watermark never moves past changes
+    younger than `safety_window`: they are returned again by the next sync
+    rather than risk skipping a slower transaction committed later.
+    """
+    settled_before = func.now() - literal(safety_window)
+    items_statement = select(Item, col(Item.updated_at) <= settled_before)
+    tombstones_statement = select(
+        ItemTombstone.item_id,
+        ItemTombstone.deleted_at,
+        col(ItemTombstone.deleted_at) <= settled_before,
+    )
+    if owner_id is not None:
+        items_statement = items_statement.where(Item.owner_id == owner_id)
+        tombstones_statement = tombstones_statement.where(
+            ItemTombstone.owner_id == owner_id
+        )
+    if since is not None:
+        items_statement = items_statement.where(
+            tuple_(Item.updated_at, Item.id) > tuple_(*since)
+        )
+        tombstones_statement = tombstones_statement.where(
+            tuple_(ItemTombstone.deleted_at, ItemTombstone.item_id) > tuple_(*since)
+        )
+    items = session.exec(
+        items_statement.order_by(col(Item.updated_at), col(Item.id)).limit(limit + 1)
+    ).all()
+    tombstones = session.exec(
+        tombstones_statement.order_by(
+            col(ItemTombstone.deleted_at), col(ItemTombstone.item_id)
+        ).limit(limit + 1)
+    ).all()
+
+    changes: list[tuple[datetime, uuid.UUID, bool, Item | None]] = [
+        (item.updated_at, item.id, settled, item)  # type: ignore[misc]
+        for item, settled in items
+    ]
+    changes += [
+        (deleted_at, item_id, settled, None)  # type: ignore[misc]
+        for item_id, deleted_at, settled in tombstones
+    ]
+    changes.sort(key=lambda change: (change[0], change[1]))
+
+    watermark = encode_watermark(*since) if since else None
+    upserted = []
+    deleted = []
+    for changed_at, id, settled, item in changes[:limit]:
+        if item is not None:
+            upserted.append(ItemPublic.model_validate(item))
+        else:
+            deleted.append(id)
+        if settled:
+            watermark = encode_watermark(changed_at, id)
+    return ItemChanges(
+        upserted=upserted,
+        deleted=deleted,
+        watermark=watermark,
+        has_more=len(changes) > limit,
+    )
+
+
+# Columns each item listing sort orders by, id breaking ties. Titles are
+# compared in byte order, the collation of ix_item_owner_id_title.
+_ITEM_SORTS: dict[str, tuple[Any, ...]] = {
+    "title": (col(Item.title).collate("C"), col(Item.id)),
+    "created_at": (col(Item.created_at), col(Item.id)),
+    "id": (col(Item.id),),
+}
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Smallest string greater than every string starting with `prefix`, in code
+    point order, or None if there is none.
+    """
+    while prefix:
+        last = ord(prefix[-1]) + 1
+        if 0xD800 <= last <= 0xDFFF:
+            # Surrogates cannot be encoded in UTF-8
+            last = 0xE000
+        if last <= 0x10FFFF:
+            return prefix[:-1] + chr(last)
+        prefix = prefix[:-1]
+    return None
+
+
+def read_items_page(
+    *,
+    session: Session,
+    owner_id: uuid.UUID | None,
+    skip: int,
+    limit: int,
+    sort: Literal["title", "created_at", "id"] | None = None,
+    descending: bool = False,
+    title_prefix: str | None = None,
+    has_description: bool | None = None,
+    tags: Sequence[str] = (),
+    all_tags: bool = False,
+) -> ItemsPublic:
+    """
+    Read one page of items, of a single owner or of everyone if `owner_id` is None.
+
+    Only the sorts and filters that an index keeps to a range scan are read,
+    others raise UnindexedItemQueryError: the items of an owner can be sorted
+    by any of title, created_at or id, and the items of everyone only by id,
+    through the primary keys of the partitions. A `title_prefix` is a range of
+    ix_item_owner_id_title, so it needs an owner and the title sort, or no
+    sort. `has_description` is checked on the rows of the range.
+
+    `tags` keeps the items with any of the tags, or with all of them if
+    `all_tags`, read from the GIN index ix_item_tags; only the matching items
+    are then sorted.
+    """
+    if owner_id is None and sort not in (None, "id"):
+        raise UnindexedItemQueryError("Items of every owner can only be sorted by id")
+    if title_prefix is not None:
+        if owner_id is None:
+            raise UnindexedItemQueryError("Title prefixes need an owner")
+        if sort not in (None, "title"):
+            raise UnindexedItemQueryError("Title prefixes can only be sorted by title")
+    statement = select_public(Item, ItemPublic)
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    if title_prefix is not None:
+        title = col(Item.title).collate("C")
+        statement = statement.where(title >= title_prefix)
+        upper_bound = _prefix_upper_bound(title_prefix)
+        if upper_bound is not None:
+            statement = statement.where(title < upper_bound)
+    if has_description is not None:
+        has_text = func.coalesce(col(Item.description), "") != ""
+        statement = statement.where(has_text if has_description else ~has_text)
+    if tags:
+        tags_param = bindparam("tags", list(tags), type_=ARRAY(String))
+        # @> (contains all) and && (overlaps) are the operators of the GIN index
+        statement = statement.where(
+            col(Item.tags).op("@>" if all_tags else "&&")(tags_param)
+        )
+    order_by = _ITEM_SORTS[sort] if sort else ()
+    if descending:
+        order_by = tuple(column.desc() for column in order_by)
+    items, count = read_models_page(
+        session=session,
+        model=ItemPublic,
+        statement=statement,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+    )
+    return ItemsPublic.model_construct(data=items, count=count)
+
+
+def read_item_tags(*, session: Session, owner_id: uuid.UUID) -> ItemTagsPublic:
+    """
+    Count the items of `owner_id` by tag, most used tags first.
+    """
+    tag = func.unnest(col(Item.tags)).label("tag")
+    tags = select(tag).where(col(Item.owner_id) == owner_id).subquery()
+    count = func.count().label("count")
+    statement = (
+        select(tags.c.tag, count)
+        .group_by(tags.c.tag)
+        .order_by(count.desc(), tags.c.tag)
+    )
+    rows = session.connection().execute(statement)
+    return ItemTagsPublic.model_construct(data=_construct_all(ItemTagCount, rows))
+
+
+def read_users_page(
+    *,
+    session: Session,
+    skip: int,
+    limit: int,
+    q: str | None = None,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    after: str | None = None,
+) -> UsersPublic:
+    """
+    Read one page of the users that are not pending deletion, sorted by email.
+
+    `q` matches a substring of the email or full name, ignoring case, through
+    the trigram indexes. `after` is the email of the last user of the previous
+    page, read with keyset pagination instead of `skip`.
+    """
+    statement = select_public(User, UserPublic).where(
+        col(User.pending_deletion).is_(False)
+    )
+    if q:
+        pattern = (
+            "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        )
+        statement = statement.where(
+            or_(col(User.email).ilike(pattern), col(User.full_name).ilike(pattern))
+        )
+    if is_active is not None:
+        statement = statement.where(col(User.is_active).is_(is_active))
+    if is_superuser is not None:
+        statement = statement.where(col(User.is_superuser).is_(is_superuser))
+    # lower(email) is unique, and sorted by ix_user_email_lower
+    email_key = func.lower(User.email)
+    users, count = read_models_page(
+        session=session,
+        model=UserPublic,
+        statement=statement,
+        skip=skip,
+        limit=limit,
+        order_by=[email_key],
+        after=None if after is None else email_key > func.lower(after),
+    )
+    return UsersPublic.model_construct(data=users, count=count)
+
+
+def read_items_by_ids(
+    *, session: Session, ids: Sequence[uuid.UUID]
+) -> list[ItemPublic]:
+    """
+    Read the existing items among `ids`, in no particular order.
+    """
+    statement = select_public(Item, ItemPublic).where(
+        col(Item.id) == any_(bindparam("ids", list(ids), type_=ARRAY(Uuid)))
+    )
+    return read_models(session=session, model=ItemPublic, statement=statement)
+
+
+def read_users_by_ids(
+    *, session: Session, ids: Sequence[uuid.UUID]
+) -> list[UserPublic]:
+    """
+    Read the users among `ids` that exist and are not pending deletion, in no
+    particular order.
+    """
+    statement = select_public(User, UserPublic).where(
+        col(User.id) == any_(bindparam("ids", list(ids), type_=ARRAY(Uuid))),
+        col(User.pending_deletion).is_(False),
+    )
+    return read_models(session=session, model=UserPublic, statement=statement)
+
+
+def invalidate_item_lists(*, owner_id: uuid.UUID) -> None:
+    """
+    Drop the cached item pages that may contain items of `owner_id`.
+
+    Call it after the write has been committed.
+    """
+    item_list_cache.invalidate(str(owner_id), ALL_OWNERS)
+    item_tags_cache.invalidate(str(owner_id))
+
+
+def enqueue_job(
+    *,
+    session: Session,
+    task: str,
+    payload: dict[str, Any] | None = None,
+    delay: timedelta = timedelta(),
+    max_attempts: int | None = None,
+) -> uuid.UUID:
+    """
+    Queue a call of the worker task `task` with the JSON `payload` as keyword
+    arguments, due after `delay`.
+
+    The job is only added to the session, it is queued by the commit of the
+    caller's transaction, along with the write it follows from.
+    """
+    job = Job(
+        task=task,
+        payload=payload or {},
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    # Set by the INSERT, on the clock of the database like the claims
+    job.run_at = func.now() + delay  # type: ignore[assignment]
+    session.add(job)
+    return job.id
+
+
+def claim_jobs(
+    *, session: Session, limit: int, visibility_timeout: timedelta
+) -> list[Job]:
+    """
+    Claim up to `limit` due jobs, hidden from the other workers for
+    `visibility_timeout`.
+
+    Running jobs past their timeout are claimed again, or marked dead if they
+    have no attempt left.
+    """
+    due = (
+        select(Job.id)
+        .where(
+            col(Job.status).in_((JOB_QUEUED, JOB_RUNNING)),
+            col(Job.run_at) <= func.now(),
+        )
+        .order_by(col(Job.run_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    exhausted = col(Job.attempts) >= col(Job.max_attempts)
+    statement = (
+        update(Job)
+        .where(col(Job.id).in_(due.scalar_subquery()))
+        .values(
+            status=case((exhausted, JOB_DEAD), else_=JOB_RUNNING),
+            attempts=case((exhausted, Job.attempts), else_=Job.attempts + 1),
+            run_at=func.now() + visibility_timeout,
+        )
+        .returning(Job)
+    )
+    jobs = session.scalars(statement).all()
+    session.commit()
+    return [job for job in jobs if job.status == JOB_RUNNING]
+
+
+def _claimed_attempt(job: Job) -> list[Any]:
+    # Leaves alone a job claimed again or given up after its visibility timeout
+    return [
+        col(Job.id) == job.id,
+        col(Job.status) == JOB_RUNNING,
+        col(Job.attempts) == job.attempts,
+    ]
+
+
+def complete_job(*, session: Session, job: Job) -> None:
+    statement = delete(Job).where(*_claimed_attempt(job))
+    session.exec(statement)  # type: ignore
+    session.commit()
+
+
+def fail_job(*, session: Session, job: Job, error: str, retry_delay: timedelta) -> None:
+    """
+    Record a failed attempt of a claimed job, queued again after `retry_delay`
+    or marked dead if it has no attempt left.
+    """
+    dead = job.attempts >= job.max_attempts
+    statement = (
+        update(Job)
+        .where(*_claimed_attempt(job))
+        .values(
+            status=JOB_DEAD if dead else JOB_QUEUED,
+            run_at=func.now() + retry_delay,
+            last_error=error,
+        )
+    )
+    session.exec(statement)  # type: ignore
     session.commit()
-    session.refresh(db_item)
-    return db_item
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import Sequence
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.batching import MicroBatcher, Pending
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, ItemCreate
+
+logger = logging.getLogger(__name__)
+
+ItemCreation = tuple[ItemCreate, uuid.UUID]
+
+
+class ItemCreateBatcher(MicroBatcher[ItemCreation, Item]):
+    """
+    Group commit of item creations.
+
+    The (item, owner id) creations submitted concurrently are inserted by one
+    transaction, so that a burst of creations waits for one commit per batch
+    instead of one per item. Each submission gets its own item, or its own
+    error: a failing batch is retried item by item.
+    """
+
+    def __init__(self, *, batch_size: int, max_delay: float) -> None:
+        super().__init__(
+            name="item-group-commit", batch_size=batch_size, max_delay=max_delay
+        )
+
+    async def create(self, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
+        return await asyncio.wrap_future(self.submit((item_in, owner_id)))
+
+    def process(self, batch: Sequence[Pending[ItemCreation, Item]]) -> None:
+        try:
+            with Session(engine, expire_on_commit=False) as session:
+                items = crud.create_items(
+                    session=session, items=[pending.key for pending in batch]
+                )
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # The whole statement failed, for one item or for all of them
+            logger.warning(
+                f"Group commit of {len(batch)} items failed, retrying one by one"
+            )
+            for pending in batch:
+                self.process([pending])
+            return
+        for pending, item in zip(batch, items, strict=True):
+            pending.future.set_result(item)
+
+
+item_create_batcher = ItemCreateBatcher(
+    batch_size=settings.ITEM_CREATE_BATCH_SIZE,
+    max_delay=settings.ITEM_CREATE_BATCH_DELAY_SECONDS,
+)
@@ -0,0 +1,82 @@
+import threading
+import uuid
+from collections.abc import Sequence
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+from sqlalchemy import Uuid, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, SQLModel, select
+
+from app.core.batching import MicroBatcher, Pending
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, User
+
+M = TypeVar("M", bound=SQLModel)
+
+
+class EntityLoader(MicroBatcher[uuid.UUID, M | None], Generic[M]):
+    """
+    Lookups of `model` rows by id, batched across the requests of a worker.
+
+    The ids looked up concurrently are read by a single `id = ANY(...)` query.
+    Lookups of an id already waiting for the next batch share its result, but
+    not those of an id whose query is running, which may predate their write.
+    """
+
+    def __init__(self, model: type[M], *, batch_size: int, max_delay: float) -> None:
+        super().__init__(
+            name=f"{model.__name__.lower()}-loader",
+            batch_size=batch_size,
+            max_delay=max_delay,
+        )
+        self.model = model
+        self._waiting: dict[uuid.UUID, Future[M | None]] = {}
+        self._waiting_lock = threading.Lock()
+
+    def submit(self, key: uuid.UUID) -> Future[M | None]:
+        with self._waiting_lock:
+            future = self._waiting.get(key)
+            if future is None or future.done():
+                future = self._waiting[key] = super().submit(key)
+        return future
+
+    def get(self, session: Session, id: uuid.UUID) -> M | None:
+        """
+        Same as `session.get(model, id)`, through the loader when
+        ENTITY_LOOKUP_BATCHING is enabled: the row is then merged into
+        `session` without querying it again.
+        """
+        if not settings.ENTITY_LOOKUP_BATCHING:
+            return session.get(self.model, id)
+        row = self.submit(id).result()
+        return None if row is None else session.merge(row, load=False)
+
+    def process(self, batch: Sequence[Pending[uuid.UUID, M | None]]) -> None:
+        with self._waiting_lock:
+            for pending in batch:
+                if self._waiting.get(pending.key) is pending.future:
+                    del self._waiting[pending.key]
+        ids = [pending.key for pending in batch]
+        statement = select(self.model).where(
+            self.model.id == any_(bindparam("ids", ids, type_=ARRAY(Uuid)))  # type: ignore[attr-defined]
+        )
+        # Rows are detached once the session is closed, each request merges
+        # its own copy
+        with Session(engine) as session:
+            rows = {row.id: row for row in session.exec(statement)}  # type: ignore[attr-defined]
+        for pending in batch:
+            pending.future.set_result(rows.get(pending.key))
+
+
+user_loader = EntityLoader(
+    User,
+    batch_size=settings.ENTITY_LOOKUP_BATCH_SIZE,
+    max_delay=settings.ENTITY_LOOKUP_BATCH_DELAY_SECONDS,
+)
+item_loader = EntityLoader(
+    Item,
+    batch_size=settings.ENTITY_LOOKUP_BATCH_SIZE,
+    max_delay=settings.ENTITY_LOOKUP_BATCH_DELAY_SECONDS,
+)
@@ -1,10 +1,19 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.events import item_change_broker
+from app.core.storage import get_storage
+from app.group_commit import item_create_batcher
+from app.loaders import item_loader, user_loader
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +23,24 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # A storage backend that cannot be set up fails the start, not an upload
+    get_storage()
+    yield
+    item_change_broker.close()
+    item_create_batcher.close()
+    user_loader.close()
+    item_loader.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +53,9 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE
+    )
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,12 +1,18 @@
 import uuid
+from datetime import datetime
+from typing import Annotated, Any, Literal
 
-from pydantic import EmailStr
-from sqlmodel import Field, Relationship, SQLModel
+from pydantic import EmailStr, StringConstraints, field_validator
+from sqlalchemy import BigInteger, ForeignKeyConstraint, String
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlmodel import DateTime, Field, Index, Relationship, SQLModel, func, text
+
+from app.core.ids import uuid7
 
 
 # Shared properties
 class UserBase(SQLModel):
-    email: EmailStr = Field(unique=True, index=True, max_length=255)
+    email: EmailStr = Field(max_length=255)
     is_active: bool = True
     is_superuser: bool = False
     full_name: str | None = Field(default=None, max_length=255)
@@ -41,9 +47,36 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Emails are unique and looked up regardless of case, see get_user_by_email.
+    # Substring searches use the trigram indexes, see read_users_page.
+    __table_args__ = (
+        Index("ix_user_email_lower", func.lower(text("email")), unique=True),
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     hashed_password: str
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
+    # Deactivated and hidden, waiting for its items to be purged
+    pending_deletion: bool = False
+    # Items are removed by the ON DELETE CASCADE of item.owner_id, without being
+    # loaded; relationships raise on lazy load instead of querying implicitly.
+    items: list["Item"] = Relationship(
+        back_populates="owner",
+        cascade_delete=True,
+        passive_deletes=True,
+        sa_relationship_kwargs={"lazy": "raise"},
+    )
 
 
 # Properties to return via API, id is always required
@@ -56,10 +89,86 @@ class UsersPublic(SQLModel):
     count: int
 
 
+# Outcome of one row of a bulk user provisioning upload
+class UserProvisionRow(SQLModel):
+    # Number of the row in the upload, from 1, not counting a CSV header
+    row: int
+    email: str | None
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    id: uuid.UUID | None = None
+    error: str | None = None
+
+
+class UsersProvisioned(SQLModel):
+    created: int
+    rows: list[UserProvisionRow]
+
+
+# Users requested by id, by outcome
+class UsersBatch(SQLModel):
+    found: list[UserPublic]
+    missing: list[uuid.UUID]
+    forbidden: list[uuid.UUID]
+
+
+# Progress of a background account deletion, kept after the user row is gone
+class UserDeletion(SQLModel, table=True):
+    user_id: uuid.UUID = Field(primary_key=True)
+    email: str = Field(max_length=255)
+    requested_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    items_total: int | None = None
+    items_deleted: int = 0
+    completed_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+class UserDeletionPublic(SQLModel):
+    user_id: uuid.UUID
+    email: str
+    requested_at: datetime
+    items_total: int | None
+    items_deleted: int
+    completed_at: datetime | None
+
+
+class UserDeletionsPublic(SQLModel):
+    data: list[UserDeletionPublic]
+    count: int
+
+
+# Tags are lowercased and kept once per item, commas separate them in queries
+Tag = Annotated[
+    str,
+    StringConstraints(
+        strip_whitespace=True,
+        to_lower=True,
+        min_length=1,
+        max_length=50,
+        pattern="^[^,]+$",
+    ),
+]
+
+
 # Shared properties
 class ItemBase(SQLModel):
     title: str = Field(min_length=1, max_length=255)
     description: str | None = Field(default=None, max_length=255)
+    tags: list[Tag] = Field(
+        default_factory=list,
+        max_length=20,
+        sa_type=ARRAY(String),  # type: ignore
+        sa_column_kwargs={"server_default": text("'{}'")},
+    )
+
+    @field_validator("tags")
+    @classmethod
+    def _unique_tags(cls, tags: list[str] | None) -> list[str] | None:
+        return list(dict.fromkeys(tags)) if tags else tags
 
 
 # Properties to receive on item creation
@@ -70,21 +179,70 @@ class ItemCreate(ItemBase):
 # Properties to receive on item update
 class ItemUpdate(ItemBase):
     title: str | None = Field(default=None, min_length=1, max_length=255)  # type: ignore
+    tags: list[Tag] | None = Field(default=None, max_length=20)  # type: ignore
 
 
 # Database model, database table inferred from class name
+# The table is hash partitioned on owner_id with a (id, owner_id) primary key,
+# see migration 13697377fff7; filtering on owner_id prunes partitions.
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_item_owner_id_updated_at", "owner_id", "updated_at", "id"),
+        # Listing sorts, title in byte order so that title prefixes are ranges
+        Index("ix_item_owner_id_id", "owner_id", "id"),
+        Index("ix_item_owner_id_title", "owner_id", text('title COLLATE "C"'), "id"),
+        Index("ix_item_owner_id_created_at", "owner_id", "created_at", "id"),
+        # Tag filters, see read_items_page
+        Index("ix_item_tags", "tags", postgresql_using="gin"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
     )
-    owner: User | None = Relationship(back_populates="items")
+    # Set by the database on insert and on every update
+    created_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    updated_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now(), "onupdate": func.now()},
+    )
+    owner: User | None = Relationship(
+        back_populates="items", sa_relationship_kwargs={"lazy": "raise"}
+    )
+
+
+# Deleted item, kept so that delta syncs can report the deletion
+class ItemTombstone(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_itemtombstone_owner_id_deleted_at", "owner_id", "deleted_at", "item_id"
+        ),
+        Index("ix_itemtombstone_deleted_at", "deleted_at"),
+    )
+
+    item_id: uuid.UUID = Field(primary_key=True)
+    owner_id: uuid.UUID
+    deleted_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
 
 
 # Properties to return via API, id is always required
 class ItemPublic(ItemBase):
     id: uuid.UUID
     owner_id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
 
 
 class ItemsPublic(SQLModel):
@@ -92,6 +250,171 @@ class ItemsPublic(SQLModel):
     count: int
 
 
+class ItemTagCount(SQLModel):
+    tag: str
+    count: int
+
+
+# Tags of the items of an owner, most used first
+class ItemTagsPublic(SQLModel):
+    data: list[ItemTagCount]
+
+
+# File attached to an item, stored under attachment_key() by the storage
+# backend; the row is deleted with its item by the cascade and the file by the
+# outbox handlers of app.attachments.
+class ItemAttachment(SQLModel, table=True):
+    __table_args__ = (
+        # The primary key of the partitioned item table includes owner_id
+        ForeignKeyConstraint(
+            ["item_id", "owner_id"],
+            ["item.id", "item.owner_id"],
+            name="itemattachment_item_id_owner_id_fkey",
+            ondelete="CASCADE",
+        ),
+        Index("ix_itemattachment_item_id_created_at", "item_id", "created_at"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
+    item_id: uuid.UUID
+    owner_id: uuid.UUID
+    filename: str = Field(max_length=255)
+    content_type: str = Field(max_length=255)
+    size: int = Field(sa_type=BigInteger)
+    # Hex SHA-256 of the content, computed while it was uploaded
+    sha256: str = Field(max_length=64)
+    created_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+
+
+class ItemAttachmentPublic(SQLModel):
+    id: uuid.UUID
+    item_id: uuid.UUID
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: datetime
+
+
+class ItemAttachmentsPublic(SQLModel):
+    data: list[ItemAttachmentPublic]
+    count: int
+
+
+# Items requested by id, by outcome
+class ItemsBatch(SQLModel):
+    found: list[ItemPublic]
+    missing: list[uuid.UUID]
+    forbidden: list[uuid.UUID]
+
+
+class ItemChanges(SQLModel):
+    upserted: list[ItemPublic]
+    deleted: list[uuid.UUID]
+    # Opaque position to pass as `since` on the next sync
+    watermark: str | None
+    has_more: bool
+
+
+# Item change pushed to the subscribers of the item stream
+class ItemChangeEvent(SQLModel):
+    op: Literal["upsert", "delete"]
+    id: uuid.UUID
+    owner_id: uuid.UUID
+
+
+# Domain event written in the transaction of the change it describes, then
+# dispatched to the handlers of its topic by the outbox relay (app.outbox)
+class OutboxEvent(SQLModel, table=True):
+    __tablename__ = "outbox"
+    __table_args__ = (Index("ix_outbox_available_at", "available_at", "id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    topic: str = Field(max_length=64)
+    payload: dict[str, Any] = Field(sa_type=JSONB)
+    created_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    # Failed dispatches are retried from this time on, with a growing delay
+    available_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    last_error: str | None = None
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DEAD = "dead"
+
+
+# Background job run by the workers (app.worker), deleted once it succeeds.
+# A job is "running" until its visibility timeout, then claimed again if its
+# worker did not finish it, and "dead" once it has used all its attempts.
+class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_job_run_at",
+            "run_at",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
+    task: str = Field(max_length=255)
+    payload: dict[str, Any] = Field(default_factory=dict, sa_type=JSONB)
+    status: str = Field(default=JOB_QUEUED, max_length=16)
+    attempts: int = 0
+    max_attempts: int
+    # Time the job is due, or the end of its visibility timeout while running
+    run_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    created_at: datetime | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    last_error: str | None = None
+
+
+# Counters of an in-process response cache
+class CacheStats(SQLModel):
+    size: int
+    maxsize: int
+    hits: int
+    stale_hits: int
+    misses: int
+    evictions: int
+    refreshes: int
+    hit_ratio: float
+
+
+# Counters of the response compression, per content coding
+class CompressionStats(SQLModel):
+    encoding: str
+    responses: int
+    bytes_in: int
+    bytes_out: int
+    ratio: float
+    cpu_seconds: float
+
+
 # Generic message
 class Message(SQLModel):
     message: str
@@ -105,7 +428,7 @@ class Token(SQLModel):
 
 # Contents of JWT token
 class TokenPayload(SQLModel):
-    sub: str | None = None
+    sub: uuid.UUID | None = None
 
 
 class NewPassword(SQLModel):
@@ -0,0 +1,134 @@
+import argparse
+import importlib
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import ColumnElement
+from sqlmodel import (
+    DateTime,
+    Session,
+    col,
+    delete,
+    func,
+    literal_column,
+    select,
+    update,
+)
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, dict[str, Any]], None]
+
+# Handlers by topic, "*" receives every event
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+
+
+def register(topic: str) -> Callable[[Handler], Handler]:
+    """
+    Register the decorated function as a handler of the events of `topic`.
+
+    Events are delivered at least once, an event whose transaction fails after
+    its dispatch is dispatched again, so handlers must be idempotent.
+    """
+
+    def decorator(handler: Handler) -> Handler:
+        _handlers[topic].append(handler)
+        return handler
+
+    return decorator
+
+
+@register("*")
+def log_event(topic: str, payload: dict[str, Any]) -> None:
+    logger.debug(f"Outbox event {topic}: {payload}")
+
+
+def dispatch(event: OutboxEvent) -> None:
+    for handler in [*_handlers[event.topic], *_handlers["*"]]:
+        handler(event.topic, event.payload)
+
+
+def relay_batch(*, session: Session, batch_size: int) -> int:
+    """
+    Dispatch up to `batch_size` available events in one transaction, returning
+    how many were processed.
+
+    Rows are locked with SKIP LOCKED, so several relays can drain the outbox
+    concurrently. Dispatched events are deleted, failed ones are retried later
+    and given up after OUTBOX_MAX_ATTEMPTS, staying in the table.
+    """
+    statement = (
+        select(OutboxEvent)
+        .where(col(OutboxEvent.available_at) <= func.now())
+        .order_by(col(OutboxEvent.available_at), col(OutboxEvent.id))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    events = session.exec(statement).all()
+    dispatched = []
+    for event in events:
+        try:
+            dispatch(event)
+        except Exception as e:
+            logger.exception(f"Outbox event {event.id} ({event.topic}) failed")
+            attempts = event.attempts + 1
+            available_at: ColumnElement[datetime]
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                available_at = literal_column("'infinity'", DateTime(timezone=True))
+            else:
+                delay = settings.OUTBOX_RETRY_DELAY_SECONDS * 2**event.attempts
+                available_at = func.now() + timedelta(seconds=delay)
+            retry = (
+                update(OutboxEvent)
+                .where(col(OutboxEvent.id) == event.id)
+                .values(
+                    attempts=attempts, last_error=repr(e), available_at=available_at
+                )
+            )
+            session.exec(retry)  # type: ignore
+        else:
+            dispatched.append(event.id)
+    if dispatched:
+        session.exec(delete(OutboxEvent).where(col(OutboxEvent.id).in_(dispatched)))  # type: ignore
+    session.commit()
+    return len(events)
+
+
+def relay(*, once: bool = False) -> None:
+    """
+    Drain the outbox in batches, polling for new events unless `once`.
+    """
+    while True:
+        with Session(engine) as session:
+            processed = relay_batch(
+                session=session, batch_size=settings.OUTBOX_BATCH_SIZE
+            )
+        if processed < settings.OUTBOX_BATCH_SIZE:
+            if once:
+                return
+            time.sleep(settings.OUTBOX_POLL_SECONDS)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Dispatch the outbox events.")
+    parser.add_argument(
+        "--once", action="store_true", help="exit once the outbox is drained"
+    )
+    args = parser.parse_args()
+    for module in settings.OUTBOX_HANDLER_MODULES:
+        importlib.import_module(module)
+    logger.info("Relaying outbox events")
+    relay(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
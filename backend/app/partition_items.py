@@ -0,0 +1,84 @@
+"""
+Copy the existing rows of item into item_partitioned, online and in batches.
+
+Run it between the migrations 13697377fff7, which creates the partitioned
+table and mirrors new writes into it, and d4f1152a82df, which swaps the
+tables:
+
+    alembic upgrade 13697377fff7
+    python -m app.partition_items
+    alembic upgrade head
+"""
+
+import argparse
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The copied rows are locked FOR KEY SHARE: a concurrent delete waits for the
+# batch to commit and its trigger then removes the copy, while concurrent
+# updates are upserted by the trigger and win over the copied version.
+COPY_BATCH = text("""
+    WITH batch AS (
+        SELECT id, owner_id, title, description FROM item
+        WHERE CAST(:after AS UUID) IS NULL OR id > CAST(:after AS UUID)
+        ORDER BY id
+        LIMIT :batch_size
+        FOR KEY SHARE
+    ), copied AS (
+        INSERT INTO item_partitioned (id, owner_id, title, description)
+        SELECT id, owner_id, title, description FROM batch
+        ON CONFLICT (id, owner_id) DO NOTHING
+    )
+    SELECT id FROM batch ORDER BY id DESC LIMIT 1
+""")
+
+
+def copy_batch(
+    session: Session, *, after: uuid.UUID | None, batch_size: int
+) -> uuid.UUID | None:
+    """
+    Copy the next batch of rows after the id `after`, returning the last
+    copied id, or None once every row has been copied.
+    """
+    last_id: uuid.UUID | None = session.execute(
+        COPY_BATCH, {"after": after, "batch_size": batch_size}
+    ).scalar()
+    session.commit()
+    return last_id
+
+
+def copy_items(*, batch_size: int, pause: float) -> int:
+    batches = 0
+    after = None
+    while True:
+        with Session(engine) as session:
+            after = copy_batch(session, after=after, batch_size=batch_size)
+        if after is None:
+            return batches
+        batches += 1
+        if batches % 100 == 0:
+            logger.info(f"Copied {batches} batches, up to item {after}")
+        time.sleep(pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Copy item into item_partitioned")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.05)
+    args = parser.parse_args()
+    logger.info("Copying items into the partitioned table")
+    batches = copy_items(batch_size=args.batch_size, pause=args.pause)
+    logger.info(f"Items copied in {batches} batches")
+
+
+if __name__ == "__main__":
+    main()
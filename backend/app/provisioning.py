@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
+
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models import User, UserCreate, UserProvisionRow, UsersProvisioned
+from app.utils import generate_new_account_email, send_email
+
+logger = logging.getLogger(__name__)
+
+UploadFormat = Literal["csv", "ndjson"]
+
+
+class TooManyRowsError(Exception):
+    pass
+
+
+def parse_rows(
+    content: bytes, format: UploadFormat
+) -> list[dict[str, Any] | ValueError]:
+    """
+    Split an upload into the fields of each row, or the error of a row that
+    cannot be read.
+
+    CSV uploads have a header naming the UserCreate fields, empty cells are
+    left out. NDJSON uploads have one JSON object per line, blank lines are
+    skipped.
+    """
+    text = content.decode("utf-8-sig")
+    if format == "csv":
+        return [
+            {name: value for name, value in row.items() if name and value}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    rows: list[dict[str, Any] | ValueError] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            rows.append(e)
+            continue
+        rows.append(fields if isinstance(fields, dict) else ValueError("Not an object"))
+    return rows
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+def provision_users(
+    *, session: Session, rows: list[dict[str, Any] | ValueError]
+) -> tuple[UsersProvisioned, list[UserCreate]]:
+    """
+    Create the users of parsed upload rows, returning the outcome of every row
+    and the created users as they were uploaded, passwords included.
+
+    Emails already used, in the database or by an earlier row, are found
+    before any password is hashed. The passwords are then hashed by a thread
+    pool, bcrypt releasing the GIL, and the users are inserted in batches of
+    USER_BULK_BATCH_SIZE.
+    """
+    if len(rows) > settings.USER_BULK_MAX_ROWS:
+        raise TooManyRowsError
+    results: list[UserProvisionRow] = []
+    pending: dict[str, tuple[UserProvisionRow, UserCreate]] = {}
+    for number, fields in enumerate(rows, start=1):
+        result = UserProvisionRow(row=number, email=None, status="invalid")
+        results.append(result)
+        if isinstance(fields, ValueError):
+            result.error = str(fields)
+            continue
+        result.email = str(fields.get("email")) if "email" in fields else None
+        try:
+            user_in = UserCreate.model_validate(fields)
+        except ValidationError as e:
+            result.error = _validation_message(e)
+            continue
+        result.email = user_in.email
+        key = user_in.email.lower()
+        if key in pending:
+            result.status = "duplicate"
+            continue
+        pending[key] = (result, user_in)
+
+    for key in crud.read_taken_emails(session=session, emails=list(pending)):
+        result, _ = pending.pop(key)
+        result.status = "exists"
+
+    with ThreadPoolExecutor(max_workers=settings.USER_BULK_HASH_WORKERS) as executor:
+        hashes = executor.map(
+            get_password_hash, [user_in.password for _, user_in in pending.values()]
+        )
+        users = [
+            User.model_validate(user_in, update={"hashed_password": hashed_password})
+            for (_, user_in), hashed_password in zip(
+                pending.values(), hashes, strict=True
+            )
+        ]
+
+    created: list[UserCreate] = []
+    batch_size = settings.USER_BULK_BATCH_SIZE
+    for start in range(0, len(users), batch_size):
+        inserted = {
+            user.email.lower(): user.id
+            for user in crud.create_users(
+                session=session, users=users[start : start + batch_size]
+            )
+        }
+        for user in users[start : start + batch_size]:
+            result, user_in = pending[user.email.lower()]
+            if user.email.lower() in inserted:
+                result.status = "created"
+                result.id = inserted[user.email.lower()]
+                created.append(user_in)
+            else:
+                # Taken by a user created since the emails were checked
+                result.status = "exists"
+    return UsersProvisioned(created=len(created), rows=results), created
+
+
+def send_new_account_emails(users: list[UserCreate]) -> None:
+    for user_in in users:
+        email_data = generate_new_account_email(
+            email_to=user_in.email, username=user_in.email, password=user_in.password
+        )
+        try:
+            send_email(
+                email_to=user_in.email,
+                subject=email_data.subject,
+                html_content=email_data.html_content,
+            )
+        except Exception:
+            logger.exception(f"New account email to {user_in.email} failed")
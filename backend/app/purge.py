@@ -0,0 +1,89 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from sqlmodel import Session, col, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, UserDeletion
+
+logger = logging.getLogger(__name__)
+
+
+def purge_user(user_id: uuid.UUID) -> None:
+    """
+    Delete the items of a user pending deletion in bounded batches, each in
+    its own short transaction with a pause in between, then the user itself.
+
+    Safe to call again for a deletion that was interrupted.
+    """
+    with Session(engine) as session:
+        deletion = session.get(UserDeletion, user_id)
+        if not deletion or deletion.completed_at:
+            return
+        if deletion.items_total is None:
+            count_statement = (
+                select(func.count()).select_from(Item).where(Item.owner_id == user_id)
+            )
+            deletion.items_total = session.exec(count_statement).one()
+            session.add(deletion)
+            session.commit()
+
+    batch_size = settings.USER_PURGE_BATCH_SIZE
+    while True:
+        with Session(engine) as session:
+            deleted = crud.delete_user_items_batch(
+                session=session, user_id=user_id, batch_size=batch_size
+            )
+        if deleted < batch_size:
+            break
+        time.sleep(settings.USER_PURGE_BATCH_PAUSE_SECONDS)
+
+    with Session(engine) as session:
+        crud.complete_user_deletion(session=session, user_id=user_id)
+    logger.info(f"Purged user {user_id}")
+
+
+def resume_pending() -> None:
+    with Session(engine) as session:
+        statement = select(UserDeletion.user_id).where(
+            col(UserDeletion.completed_at).is_(None)
+        )
+        user_ids = session.exec(statement).all()
+    for user_id in user_ids:
+        purge_user(user_id)
+
+
+def prune_item_tombstones() -> None:
+    """
+    Delete the item tombstones older than the retention of delta syncs in
+    bounded batches, like the items of a purged user.
+    """
+    retention = timedelta(days=settings.ITEM_TOMBSTONE_RETENTION_DAYS)
+    batch_size = settings.ITEM_TOMBSTONE_PRUNE_BATCH_SIZE
+    pruned = 0
+    while True:
+        with Session(engine) as session:
+            deleted = crud.prune_item_tombstones_batch(
+                session=session, retention=retention, batch_size=batch_size
+            )
+        pruned += deleted
+        if deleted < batch_size:
+            break
+        time.sleep(settings.USER_PURGE_BATCH_PAUSE_SECONDS)
+    logger.info(f"Pruned {pruned} item tombstones")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Resuming pending user deletions")
+    resume_pending()
+    logger.info("Pending user deletions purged")
+    prune_item_tombstones()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
+import base64
+import hashlib
 import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
 
+import httpx
+import msgpack
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app import crud
+from app.core.cache import item_list_cache
 from app.core.config import settings
+from app.core.db import engine
+from app.core.events import item_change_broker
+from app.core.storage import LocalStorage, StorageWriter, get_storage
+from app.main import app
+from app.models import ItemCreate
 from app.tests.utils.item import create_random_item
+from app.tests.utils.user import authentication_token_from_email
+from app.tests.utils.utils import random_email, random_lower_string
 
 
 def test_create_item(
@@ -24,6 +42,21 @@ def test_create_item(
     assert "owner_id" in content
 
 
+def test_create_item_with_group_commit(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    with patch("app.core.config.settings.ITEM_CREATE_BATCHING", True):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            json={"title": "Batched", "tags": ["a"]},
+        )
+    assert response.status_code == 200
+    content = response.json()
+    assert (content["title"], content["tags"]) == ("Batched", ["a"])
+    assert content["created_at"]
+
+
 def test_read_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -79,6 +112,245 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_sorted_and_filtered(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    owner_id = item.owner_id
+    for title, description in (("b", "desc"), ("a", None), ("ab", "desc")):
+        crud.create_item(
+            session=db,
+            item_in=ItemCreate(title=title, description=description),
+            owner_id=owner_id,
+        )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={
+            "owner_id": str(owner_id),
+            "sort": "title",
+            "order": "desc",
+            "title_prefix": "a",
+        },
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["title"] for item in content["data"]] == ["ab", "a"]
+    assert content["count"] == 2
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"owner_id": str(owner_id), "sort": "title", "has_description": False},
+    )
+    assert [item["title"] for item in response.json()["data"]] == ["a"]
+
+
+def test_read_items_unindexed_query(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    for params in ({"sort": "title"}, {"title_prefix": "a"}):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 400
+    # Normal users list their own items, so any owner-scoped shape is allowed
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"sort": "created_at", "has_description": True},
+    )
+    assert response.status_code == 200
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"sort": "id", "title_prefix": "a"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Title prefixes can only be sorted by title"
+
+
+def test_read_items_owner_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"owner_id": str(uuid.uuid4())},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough permissions"
+
+
+def test_read_items_by_tags(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    tag = random_lower_string()
+    for title, tags in (("a", [tag, "x"]), ("b", [tag.upper()]), ("c", ["x"])):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": title, "tags": tags},
+        )
+        assert response.status_code == 200
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"tags": f"{tag},nope", "sort": "title"},
+    )
+    content = response.json()
+    assert [item["title"] for item in content["data"]] == ["a", "b"]
+    assert content["data"][1]["tags"] == [tag]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"tags": f"x, {tag.upper()}", "tags_match": "all"},
+    )
+    assert [item["title"] for item in response.json()["data"]] == ["a"]
+
+
+def test_read_item_tags(client: TestClient, db: Session) -> None:
+    headers = authentication_token_from_email(
+        client=client, email=random_email(), db=db
+    )
+    for tags in (["b", "a"], ["b"], []):
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=headers,
+            json={"title": "Foo", "tags": tags},
+        )
+    response = client.get(f"{settings.API_V1_STR}/items/tags", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "data": [{"tag": "b", "count": 2}, {"tag": "a", "count": 1}]
+    }
+    # Writes invalidate the cached counts
+    client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=headers,
+        json={"title": "Foo", "tags": ["a", "c"]},
+    )
+    response = client.get(f"{settings.API_V1_STR}/items/tags", headers=headers)
+    assert response.json()["data"] == [
+        {"tag": "a", "count": 2},
+        {"tag": "b", "count": 2},
+        {"tag": "c", "count": 1},
+    ]
+
+
+def test_read_item_tags_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/tags",
+        headers=normal_user_token_headers,
+        params={"owner_id": str(uuid.uuid4())},
+    )
+    assert response.status_code == 400
+
+
+def test_create_item_invalid_tag(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo", "tags": ["a,b"]},
+    )
+    assert response.status_code == 422
+
+
+def test_create_item_msgpack(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {"title": "Foo", "description": "Fighters"}
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={
+            **superuser_token_headers,
+            "Content-Type": "application/msgpack",
+            "Accept": "application/msgpack",
+        },
+        content=msgpack.packb(data),
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"]
+    content = msgpack.unpackb(response.content)
+    assert content["title"] == data["title"]
+    assert content["description"] == data["description"]
+    uuid.UUID(content["id"])
+
+
+def test_create_item_msgpack_invalid(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "Content-Type": "application/msgpack"},
+        content=msgpack.packb({"description": "no title"}),
+    )
+    assert response.status_code == 422
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "Content-Type": "application/msgpack"},
+        content=b"\xc1",
+    )
+    assert response.status_code == 400
+
+
+def test_read_items_msgpack(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    headers = {**superuser_token_headers, "Accept": "application/msgpack"}
+    response = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    content = msgpack.unpackb(response.content)
+    json_content = client.get(
+        f"{settings.API_V1_STR}/items/", headers=superuser_token_headers
+    ).json()
+    assert content == json_content
+
+
+def test_read_items_batch(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    own = crud.create_item(
+        session=db, item_in=ItemCreate(title="own"), owner_id=user.id
+    )
+    other = create_random_item(db)
+    missing = uuid.uuid4()
+    response = client.get(
+        f"{settings.API_V1_STR}/items/batch",
+        headers=normal_user_token_headers,
+        params={"ids": [str(own.id), str(other.id), str(missing), str(own.id)]},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["id"] for item in content["found"]] == [str(own.id)]
+    assert content["missing"] == [str(missing)]
+    assert content["forbidden"] == [str(other.id)]
+
+
+def test_read_items_batch_too_many_ids(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    ids = [str(uuid.uuid4()) for _ in range(settings.BATCH_FETCH_MAX_IDS + 1)]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/batch",
+        headers=superuser_token_headers,
+        params={"ids": ids},
+    )
+    assert response.status_code == 422
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +434,398 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_read_items_invalidated_on_write(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+    )
+    count = response.json()["count"]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Cached"},
+    )
+    item_id = response.json()["id"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["count"] == count + 1
+    client.delete(
+        f"{settings.API_V1_STR}/items/{item_id}",
+        headers=normal_user_token_headers,
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["count"] == count
+
+
+def test_read_cache_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    with patch.object(item_list_cache, "enabled", True):
+        client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+        client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    response = client.get(
+        f"{settings.API_V1_STR}/utils/cache-stats/",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["hits"] >= 1
+    assert 0 < content["hit_ratio"] <= 1
+    assert "evictions" in content
+
+
+def test_read_item_changes(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Synced"},
+    )
+    item_id = response.json()["id"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes", headers=normal_user_token_headers
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert item_id in [item["id"] for item in content["upserted"]]
+    assert "updated_at" in content["upserted"][0]
+
+    client.delete(
+        f"{settings.API_V1_STR}/items/{item_id}", headers=normal_user_token_headers
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes", headers=normal_user_token_headers
+    )
+    assert item_id in response.json()["deleted"]
+
+
+def test_read_item_changes_invalid_watermark(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=normal_user_token_headers,
+        params={"since": "not-a-watermark"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid watermark"
+
+
+def test_read_item_changes_out_of_range_watermark(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=normal_user_token_headers,
+        params={"since": f"{10**20}-{uuid.uuid4().hex}"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid watermark"
+
+
+def test_read_item_changes_limit_capped(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=normal_user_token_headers,
+        params={"limit": settings.ITEM_SYNC_MAX_LIMIT + 1},
+    )
+    assert response.status_code == 422
+
+
+def test_read_item_changes_expired_watermark(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    deleted_at = datetime.now(timezone.utc) - timedelta(
+        days=settings.ITEM_TOMBSTONE_RETENTION_DAYS + 1
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=normal_user_token_headers,
+        params={"since": crud.encode_watermark(deleted_at, uuid.uuid4())},
+    )
+    assert response.status_code == 410
+    assert response.json()["detail"] == "Watermark expired"
+
+
+def test_stream_items_invalid_last_event_id(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/stream",
+        headers={**normal_user_token_headers, "Last-Event-ID": "not-a-watermark"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid watermark"
+
+
+def test_stream_items_out_of_range_last_event_id(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/stream",
+        headers={
+            **normal_user_token_headers,
+            "Last-Event-ID": f"{10**20}-{uuid.uuid4().hex}",
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid watermark"
+
+
+def test_stream_items_subscriber_limit(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch.object(item_change_broker, "max_subscribers", 0):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/stream", headers=normal_user_token_headers
+        )
+    assert response.status_code == 503
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> Generator[LocalStorage, None, None]:
+    storage = LocalStorage(tmp_path)
+    app.dependency_overrides[get_storage] = lambda: storage
+    yield storage
+    del app.dependency_overrides[get_storage]
+
+
+def upload_attachment(
+    client: TestClient, headers: dict[str, str], item_id: uuid.UUID, data: bytes
+) -> httpx.Response:
+    return client.post(
+        f"{settings.API_V1_STR}/items/{item_id}/attachments",
+        headers={**headers, "Content-Type": "text/plain"},
+        params={"filename": "notes é.txt"},
+        content=iter([data[:3], data[3:]]),
+    )
+
+
+def test_item_attachment(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    storage: LocalStorage,
+) -> None:
+    item = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    ).json()
+    data = b"attached content"
+    response = upload_attachment(client, normal_user_token_headers, item["id"], data)
+    assert response.status_code == 200
+    attachment = response.json()
+    assert attachment["size"] == len(data)
+    assert attachment["sha256"] == hashlib.sha256(data).hexdigest()
+    assert attachment["content_type"] == "text/plain"
+    key = f"{item['owner_id']}/{item['id']}/{attachment['id']}"
+    assert (storage.root / key).read_bytes() == data
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item['id']}/attachments",
+        headers=normal_user_token_headers,
+    )
+    assert response.json() == {"data": [attachment], "count": 1}
+
+    url = f"{settings.API_V1_STR}/items/{item['id']}/attachments/{attachment['id']}"
+    response = client.get(url, headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-disposition"] == (
+        "attachment; filename*=utf-8''notes%20%C3%A9.txt"
+    )
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get(
+        url, headers={**normal_user_token_headers, "Range": "bytes=9-"}
+    )
+    assert response.status_code == 206
+    assert response.content == b"content"
+    assert response.headers["content-range"] == f"bytes 9-15/{len(data)}"
+    response = client.get(
+        url, headers={**normal_user_token_headers, "Range": "bytes=99-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+    response = client.get(
+        url,
+        headers={**normal_user_token_headers, "Range": "bytes=0-1", "If-Range": '"x"'},
+    )
+    assert response.status_code == 200
+    assert response.content == data
+    for conditional in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+        response = client.get(url, headers={**normal_user_token_headers, **conditional})
+        assert response.status_code == 304
+        assert response.content == b""
+    response = client.head(url, headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(data))
+
+    response = client.delete(url, headers=normal_user_token_headers)
+    assert response.status_code == 200
+    response = client.get(url, headers=normal_user_token_headers)
+    assert response.status_code == 404
+
+
+def test_item_attachment_openapi(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/openapi.json")
+    assert response.status_code == 200
+    path = f"{settings.API_V1_STR}/items/{{id}}/attachments/{{attachment_id}}"
+    assert "200" in response.json()["paths"][path]["get"]["responses"]
+
+
+def test_item_attachment_checksum(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    storage: LocalStorage,
+) -> None:
+    item_id = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    ).json()["id"]
+    data = b"checked"
+    digest = base64.b64encode(hashlib.sha256(data).digest()).decode()
+    for content_digest, status_code in (
+        (f"sha-256=:{digest}:", 200),
+        (f"md5=:x:, sha-256=:{base64.b64encode(bytes(32)).decode()}:", 400),
+        ("sha-256=abc", 400),
+    ):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/{item_id}/attachments",
+            headers={**normal_user_token_headers, "Content-Digest": content_digest},
+            params={"filename": "checked.bin"},
+            content=data,
+        )
+        assert response.status_code == status_code
+    # Only the verified upload is stored
+    assert len([path for path in storage.root.rglob("*") if path.is_file()]) == 1
+
+
+def test_item_attachment_too_large(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    storage: LocalStorage,
+) -> None:
+    item_id = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    ).json()["id"]
+    with patch("app.core.config.settings.ATTACHMENT_MAX_SIZE", 4):
+        response = upload_attachment(
+            client, normal_user_token_headers, item_id, b"too large"
+        )
+    assert response.status_code == 413
+    assert list(storage.root.rglob("*.*")) == []
+
+
+def test_item_attachment_upload_holds_no_connection(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    storage: LocalStorage,
+) -> None:
+    item_id = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    ).json()["id"]
+    checked_out: list[int] = []
+    open_writer = storage.open_writer
+
+    def record_open_writer(key: str) -> StorageWriter:
+        checked_out.append(engine.pool.checkedout())  # type: ignore[attr-defined]
+        return open_writer(key)
+
+    before = engine.pool.checkedout()  # type: ignore[attr-defined]
+    with patch.object(storage, "open_writer", record_open_writer):
+        response = upload_attachment(
+            client, normal_user_token_headers, item_id, b"streamed"
+        )
+    assert response.status_code == 200
+    assert checked_out == [before]
+
+
+def test_item_attachment_not_enough_permissions(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    storage: LocalStorage,
+) -> None:
+    item = create_random_item(db)
+    response = upload_attachment(client, normal_user_token_headers, item.id, b"data")
+    assert response.status_code == 400
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item.id}/attachments",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 400
+    assert not storage.root.exists() or list(storage.root.iterdir()) == []
+
+
+def test_item_attachment_msgpack_content_type(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    storage: LocalStorage,
+) -> None:
+    item_id = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    ).json()["id"]
+    data = msgpack.packb({"a": 1})
+    response = client.post(
+        f"{settings.API_V1_STR}/items/{item_id}/attachments",
+        headers={**normal_user_token_headers, "Content-Type": "application/msgpack"},
+        params={"filename": "data.msgpack"},
+        content=data,
+    )
+    # Stored as sent, not decoded as a MessagePack request body
+    assert response.status_code == 200
+    assert response.json()["content_type"] == "application/msgpack"
+    assert response.json()["size"] == len(data)
+    assert len(list(storage.root.rglob("*"))) == 3
+
+
+def test_read_item_with_batched_lookups(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    item = crud.create_item(
+        session=db, item_in=ItemCreate(title="Looked up"), owner_id=user.id
+    )
+    other = create_random_item(db)
+    with patch("app.core.config.settings.ENTITY_LOOKUP_BATCHING", True):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/{item.id}",
+            headers=normal_user_token_headers,
+        )
+        assert response.status_code == 200
+        assert response.json()["title"] == "Looked up"
+        response = client.get(
+            f"{settings.API_V1_STR}/items/{other.id}",
+            headers=normal_user_token_headers,
+        )
+        assert response.status_code == 400
+        response = client.get(
+            f"{settings.API_V1_STR}/items/{uuid.uuid4()}",
+            headers=normal_user_token_headers,
+        )
+        assert response.status_code == 404
@@ -1,10 +1,11 @@
 from unittest.mock import patch
 
+import jwt
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import ALGORITHM, verify_password
 from app.crud import create_user
 from app.models import UserCreate
 from app.tests.utils.user import user_authentication_headers
@@ -45,6 +46,17 @@ def test_use_access_token(
     assert "email" in result
 
 
+def test_use_access_token_without_valid_subject(client: TestClient) -> None:
+    for payload in ({"exp": 2**40}, {"exp": 2**40, "sub": "not-a-uuid"}):
+        token = jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHM)
+        r = client.post(
+            f"{settings.API_V1_STR}/login/test-token",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert r.status_code == 403
+        assert r.json()["detail"] == "Could not validate credentials"
+
+
 def test_recovery_password(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -4,10 +4,10 @@ from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
-from app import crud
+from app import crud, worker
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import Item, ItemCreate, User, UserCreate, UserDeletion
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -56,6 +56,116 @@ def test_create_user_new_email(
         assert user.email == created_user["email"]
 
 
+def test_provision_users_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    csv = (
+        "email,password,full_name\n"
+        f"{email},{password},New User\n"
+        f"{email.upper()},{password},\n"
+        f"{settings.FIRST_SUPERUSER},{password},\n"
+        f"{random_email()},short,\n"
+    )
+    with (
+        patch("app.provisioning.send_new_account_emails") as send_emails,
+        patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "admin@example.com"),
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/bulk",
+            headers=superuser_token_headers,
+            files={"file": ("users.csv", csv, "text/csv")},
+        )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["created"] == 1
+    assert [row["status"] for row in content["rows"]] == [
+        "created",
+        "duplicate",
+        "exists",
+        "invalid",
+    ]
+    assert content["rows"][3]["error"].startswith("password:")
+    user = crud.get_user_by_email(session=db, email=email)
+    assert user
+    assert str(user.id) == content["rows"][0]["id"]
+    assert user.full_name == "New User"
+    assert verify_password(password, user.hashed_password)
+    [created] = send_emails.call_args.args
+    assert [user_in.email for user_in in created] == [email]
+
+
+def test_provision_users_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    ndjson = (
+        f'{{"email": "{email}", "password": "{random_lower_string()}"}}\n'
+        "\n"
+        "not json\n"
+        "[]\n"
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers=superuser_token_headers,
+        files={"file": ("users.ndjson", ndjson, "application/x-ndjson")},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["created"] == 1
+    assert [row["status"] for row in content["rows"]] == [
+        "created",
+        "invalid",
+        "invalid",
+    ]
+    assert crud.get_user_by_email(session=db, email=email)
+
+
+def test_provision_users_rejected(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    url = f"{settings.API_V1_STR}/users/bulk"
+    csv = f"email,password\n{random_email()},{random_lower_string()}\n"
+    files = {"file": ("users.csv", csv, "text/csv")}
+    r = client.post(url, headers=normal_user_token_headers, files=files)
+    assert r.status_code == 403
+    r = client.post(
+        url,
+        headers=superuser_token_headers,
+        files={"file": ("users.txt", csv, "text/plain")},
+    )
+    assert r.status_code == 400
+    with patch("app.core.config.settings.USER_BULK_MAX_ROWS", 0):
+        r = client.post(url, headers=superuser_token_headers, files=files)
+    assert r.status_code == 400
+    with patch("app.core.config.settings.USER_BULK_MAX_SIZE", len(csv) - 1):
+        r = client.post(url, headers=superuser_token_headers, files=files)
+        assert r.status_code == 413
+        # Refused on its length, before the form is parsed
+        r = client.post(
+            url,
+            headers={
+                **superuser_token_headers,
+                "Content-Type": "multipart/form-data; boundary=x",
+            },
+            content=b"x" * len(csv),
+        )
+        assert r.status_code == 413
+    r = client.post(
+        url,
+        headers={
+            **superuser_token_headers,
+            "Content-Type": "multipart/form-data; boundary=x",
+        },
+        content=iter([csv.encode()]),
+    )
+    assert r.status_code == 411
+
+
 def test_get_existing_user(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -168,6 +278,48 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_search_users(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    marker = random_lower_string()[:12]
+    emails = sorted(f"{n}{marker}@example.com" for n in range(3))
+    for n, email in enumerate(emails):
+        crud.create_user(
+            session=db,
+            user_create=UserCreate(email=email, password="password", is_active=n != 1),
+        )
+    crud.create_user(
+        session=db,
+        user_create=UserCreate(
+            email=random_email(), password="password", full_name=f"Name {marker}"
+        ),
+    )
+    url = f"{settings.API_V1_STR}/users/"
+
+    r = client.get(url, headers=superuser_token_headers, params={"q": marker.upper()})
+    assert r.json()["count"] == 4
+    r = client.get(
+        url,
+        headers=superuser_token_headers,
+        params={"q": f"{marker}@", "is_active": True},
+    )
+    content = r.json()
+    assert [user["email"] for user in content["data"]] == [emails[0], emails[2]]
+    assert content["count"] == 2
+
+    params: dict[str, str | int] = {"q": f"{marker}@", "limit": 2}
+    first = client.get(url, headers=superuser_token_headers, params=params).json()
+    assert [user["email"] for user in first["data"]] == emails[:2]
+    params["after"] = first["data"][-1]["email"]
+    second = client.get(url, headers=superuser_token_headers, params=params).json()
+    assert [user["email"] for user in second["data"]] == emails[2:]
+    assert second["count"] == 3
+
+    r = client.get(url, headers=superuser_token_headers, params={"q": "%_\\"})
+    assert r.status_code == 200
+    assert r.json()["data"] == []
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -320,6 +472,46 @@ def test_register_user_already_exists_error(client: TestClient) -> None:
     assert r.json()["detail"] == "The user with this email already exists in the system"
 
 
+def test_register_user_already_exists_other_case(client: TestClient) -> None:
+    data = {
+        "email": settings.FIRST_SUPERUSER.upper(),
+        "password": random_lower_string(),
+    }
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+    assert r.status_code == 400
+
+
+def test_read_users_batch(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    missing = uuid.uuid4()
+    r = client.get(
+        f"{settings.API_V1_STR}/users/batch",
+        headers=superuser_token_headers,
+        params={"ids": [str(user.id), str(missing)]},
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert [found["email"] for found in content["found"]] == [user.email]
+    assert content["missing"] == [str(missing)]
+    assert content["forbidden"] == []
+
+
+def test_read_users_batch_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/batch",
+        headers=normal_user_token_headers,
+        params={"ids": [str(uuid.uuid4())]},
+    )
+    assert r.status_code == 403
+
+
 def test_update_user(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -484,3 +676,76 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_delete_user_immediate(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    user_id = user.id
+    crud.create_item(
+        session=db, item_in=ItemCreate(title=random_lower_string()), owner_id=user_id
+    )
+    with patch("app.core.config.settings.USER_DELETION_MODE", "immediate"):
+        r = client.delete(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+        )
+    assert r.status_code == 200
+    # Deleted with its items by the request itself
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).first() is None
+    assert db.get(UserDeletion, user_id) is None
+
+
+def test_delete_user_background_purge(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    user_id = user.id
+    for _ in range(5):
+        crud.create_item(
+            session=db,
+            item_in=ItemCreate(title=random_lower_string()),
+            owner_id=user_id,
+        )
+    with (
+        patch("app.core.config.settings.USER_DELETION_MODE", "background"),
+        patch("app.core.config.settings.USER_PURGE_BATCH_SIZE", 2),
+        patch("app.core.config.settings.USER_PURGE_BATCH_PAUSE_SECONDS", 0),
+    ):
+        r = client.delete(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 200
+        # Hidden at once, purged by the worker
+        assert db.exec(select(Item).where(Item.owner_id == user_id)).first()
+        while worker.run_next_job():
+            pass
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).first() is None
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/deletions", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    deletion = next(d for d in r.json()["data"] if d["user_id"] == str(user_id))
+    assert deletion["items_total"] == 5
+    assert deletion["items_deleted"] == 5
+    assert deletion["completed_at"] is not None
+
+
+def test_read_user_deletions_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/deletions", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from starlette.types import Message, Scope
+
+from app.api.downloads import RangeNotSatisfiableError, StoredFileResponse, parse_range
+from app.core.storage import LocalStorage
+
+
+def test_parse_range() -> None:
+    assert parse_range("bytes=0-9", 100) == (0, 10)
+    assert parse_range("bytes=90-", 100) == (90, 100)
+    assert parse_range("bytes=90-200", 100) == (90, 100)
+    assert parse_range("bytes=-10", 100) == (90, 100)
+    assert parse_range("bytes=-200", 100) == (0, 100)
+    # Not a single byte range, answered with the whole file
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-9", 100) is None
+    assert parse_range("bytes=9-0", 100) is None
+    assert parse_range("bytes=a-b", 100) is None
+    assert parse_range("bytes=-", 100) is None
+    for header in ("bytes=100-", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range(header, 100)
+
+
+def send_response(tmp_path: Path, scope: Scope) -> list[Message]:
+    data = b"0123456789"
+    storage = LocalStorage(tmp_path)
+    writer = storage.open_writer("a/b/c")
+    writer.write(data)
+    writer.commit()
+    response = StoredFileResponse(
+        storage=storage,
+        key="a/b/c",
+        size=len(data),
+        sha256=hashlib.sha256(data).hexdigest(),
+        last_modified=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        media_type="text/plain",
+        filename="c.txt",
+    )
+    sent: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.zerocopysend":
+            file = message["file"]
+            file.seek(message["offset"])
+            message = {**message, "file": file.read(message["count"])}
+        sent.append(message)
+
+    asyncio.run(response({"method": "GET", "headers": [], **scope}, receive, send))
+    return sent
+
+
+def test_zerocopysend(tmp_path: Path) -> None:
+    scope = {
+        "extensions": {"http.response.zerocopysend": {}},
+        "headers": [(b"range", b"bytes=2-4")],
+    }
+    start, body = send_response(tmp_path, scope)
+    assert start["status"] == 206
+    assert (b"content-range", b"bytes 2-4/10") in start["headers"]
+    assert body["type"] == "http.response.zerocopysend"
+    assert (body["offset"], body["count"], body["file"]) == (2, 3, b"234")
+
+
+def test_pathsend(tmp_path: Path) -> None:
+    start, body = send_response(
+        tmp_path, {"extensions": {"http.response.pathsend": {}}}
+    )
+    assert start["status"] == 200
+    assert body == {"type": "http.response.pathsend", "path": str(tmp_path / "a/b/c")}
+    # A range is read in chunks, pathsend always sends the whole file
+    start, *bodies = send_response(
+        tmp_path,
+        {
+            "extensions": {"http.response.pathsend": {}},
+            "headers": [(b"range", b"bytes=-3")],
+        },
+    )
+    assert start["status"] == 206
+    assert b"".join(body["body"] for body in bodies) == b"789"
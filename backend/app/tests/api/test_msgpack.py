@@ -0,0 +1,13 @@
+from app.api.msgpack import accepts_msgpack
+
+
+def test_accepts_msgpack() -> None:
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/x-msgpack")
+    assert accepts_msgpack("application/json, application/msgpack")
+    assert accepts_msgpack("application/msgpack;q=0.9, */*;q=0.8")
+    assert not accepts_msgpack("")
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack("application/json")
+    assert not accepts_msgpack("application/msgpack;q=0.5, application/json")
+    assert not accepts_msgpack("application/msgpack;q=0")
@@ -0,0 +1,108 @@
+import time
+from pathlib import Path
+
+from app.core.cache import ResponseCache
+
+
+def test_cache_hit_and_miss() -> None:
+    cache = ResponseCache(
+        maxsize=2, ttl=60.0, stale_ttl=60.0, dumps=str.encode, loads=bytes.decode
+    )
+    calls: list[int] = []
+
+    def load() -> str:
+        calls.append(1)
+        return "page"
+
+    assert cache.get_or_load("owner", (0, 100), load) == "page"
+    assert cache.get_or_load("owner", (0, 100), load) == "page"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_ratio == 0.5
+
+
+def test_cache_lru_eviction() -> None:
+    cache = ResponseCache(
+        maxsize=2, ttl=60.0, stale_ttl=60.0, dumps=str.encode, loads=bytes.decode
+    )
+    cache.get_or_load("owner", 1, lambda: "a")
+    cache.get_or_load("owner", 2, lambda: "b")
+    cache.get_or_load("owner", 1, lambda: "a")
+    cache.get_or_load("owner", 3, lambda: "c")
+    assert cache.stats().evictions == 1
+    # 2 was the least recently used entry
+    assert cache.get_or_load("owner", 1, lambda: "reloaded") == "a"
+    assert cache.get_or_load("owner", 2, lambda: "reloaded") == "reloaded"
+
+
+def test_cache_invalidate_namespace() -> None:
+    cache = ResponseCache(
+        maxsize=2, ttl=60.0, stale_ttl=60.0, dumps=str.encode, loads=bytes.decode
+    )
+    cache.get_or_load("owner", 1, lambda: "old")
+    cache.get_or_load("other", 1, lambda: "other")
+    cache.invalidate("owner")
+    assert cache.get_or_load("owner", 1, lambda: "new") == "new"
+    assert cache.get_or_load("other", 1, lambda: "changed") == "other"
+
+
+def test_cache_stale_while_revalidate() -> None:
+    cache = ResponseCache(
+        maxsize=2, ttl=0.0, stale_ttl=60.0, dumps=str.encode, loads=bytes.decode
+    )
+    cache.get_or_load("owner", 1, lambda: "old")
+    time.sleep(0.01)
+    # The stale value is served while the refresh runs in the background
+    assert cache.get_or_load("owner", 1, lambda: "new") == "old"
+    cache._executor.shutdown(wait=True)
+    assert cache.stats().refreshes == 1
+    assert cache.stats().stale_hits == 1
+
+
+def test_cache_expired_past_stale_window() -> None:
+    cache = ResponseCache(
+        maxsize=2, ttl=0.0, stale_ttl=0.0, dumps=str.encode, loads=bytes.decode
+    )
+    cache.get_or_load("owner", 1, lambda: "old")
+    time.sleep(0.01)
+    assert cache.get_or_load("owner", 1, lambda: "new") == "new"
+
+
+def test_cache_disabled() -> None:
+    cache = ResponseCache(
+        maxsize=2,
+        ttl=60.0,
+        stale_ttl=60.0,
+        dumps=str.encode,
+        loads=bytes.decode,
+        enabled=False,
+    )
+    cache.get_or_load("owner", 1, lambda: "a")
+    assert cache.get_or_load("owner", 1, lambda: "b") == "b"
+
+
+def test_cache_shared_store(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    worker_1 = ResponseCache(
+        maxsize=2,
+        ttl=60.0,
+        stale_ttl=60.0,
+        dumps=str.encode,
+        loads=bytes.decode,
+        shared_path=path,
+    )
+    worker_2 = ResponseCache(
+        maxsize=2,
+        ttl=60.0,
+        stale_ttl=60.0,
+        dumps=str.encode,
+        loads=bytes.decode,
+        shared_path=path,
+    )
+    worker_1.get_or_load("owner", 1, lambda: "page")
+    # Served from the shared store without calling the loader
+    assert worker_2.get_or_load("owner", 1, lambda: "reloaded") == "page"
+    worker_2.invalidate("owner")
+    assert worker_1.get_or_load("owner", 1, lambda: "new") == "new"
@@ -0,0 +1,179 @@
+import asyncio
+import zlib
+from collections.abc import Callable
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core.compression import (
+    ENCODINGS,
+    CompressionMetrics,
+    CompressionMiddleware,
+    negotiate,
+)
+
+BODY = "item " * 1000
+
+
+def make_client(metrics: CompressionMetrics) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, metrics=metrics)
+
+    @app.get("/large")
+    def large() -> PlainTextResponse:
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    def small() -> PlainTextResponse:
+        return PlainTextResponse("small")
+
+    @app.get("/encoded")
+    def encoded() -> PlainTextResponse:
+        return PlainTextResponse(BODY, headers={"Content-Encoding": "identity"})
+
+    return TestClient(app)
+
+
+def test_negotiate() -> None:
+    available = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, br, zstd", available) == "zstd"
+    assert negotiate("gzip, br;q=0.5", available) == "gzip"
+    assert negotiate("gzip;q=0, br", available) == "br"
+    assert negotiate("*;q=0.1, zstd;q=0", available) == "br"
+    assert negotiate("identity", available) is None
+    assert negotiate("", available) is None
+    assert negotiate("gzip;q=x", available) is None
+
+
+def test_compress_large_response() -> None:
+    metrics = CompressionMetrics()
+    client = make_client(metrics)
+    r = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(BODY)
+    assert r.text == BODY
+    [stats] = metrics.stats()
+    assert stats.encoding == "gzip"
+    assert stats.responses == 1
+    assert stats.bytes_in == len(BODY)
+    assert stats.bytes_out == int(r.headers["content-length"])
+    assert stats.ratio > 10
+
+
+def test_skip_small_and_encoded_responses() -> None:
+    metrics = CompressionMetrics()
+    client = make_client(metrics)
+    r = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.text == "small"
+    r = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "identity"
+    r = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert metrics.stats() == []
+
+
+def test_compress_streaming_response() -> None:
+    async def app(_scope: Scope, _receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for n in range(3):
+            body = f"data: {n}\n\n".encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent: list[Message] = []
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    async def receive() -> Message:
+        return {"type": "http.request"}
+
+    metrics = CompressionMetrics()
+    middleware = CompressionMiddleware(app, metrics=metrics)
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(middleware(scope, receive, send))
+
+    headers = Headers(raw=sent[0]["headers"])
+    assert headers["content-encoding"] == "gzip"
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    # Every chunk is flushed, so it decompresses as soon as it is received
+    chunks = [decompressor.decompress(message["body"]) for message in sent[1:]]
+    assert chunks == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n", b""]
+    assert decompressor.eof
+    assert [message.get("more_body") for message in sent[1:]] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert metrics.stats()[0].responses == 1
+
+
+@pytest.mark.parametrize(
+    "encoding,decompress",
+    [
+        (
+            "zstd",
+            lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+        ),
+        ("br", brotli.decompress),
+        ("gzip", lambda data: zlib.decompress(data, zlib.MAX_WBITS | 16)),
+    ],
+)
+def test_compress_each_encoding(
+    encoding: str, decompress: Callable[[bytes], bytes]
+) -> None:
+    metrics = CompressionMetrics()
+    client = make_client(metrics)
+    with client.stream("GET", "/large", headers={"Accept-Encoding": encoding}) as r:
+        assert r.headers["content-encoding"] == encoding
+        body = b"".join(r.iter_raw())
+    assert decompress(body) == BODY.encode()
+    assert [stats.encoding for stats in metrics.stats()] == [encoding]
+
+
+def test_preferred_encodings() -> None:
+    assert list(ENCODINGS) == ["zstd", "br", "gzip"]
+    client = make_client(CompressionMetrics())
+    r = client.get("/large", headers={"Accept-Encoding": "gzip, br, zstd"})
+    assert r.headers["content-encoding"] == "zstd"
+
+
+def test_skip_range_and_pathsend_responses() -> None:
+    async def app(scope: Scope, _receive: Receive, send: Send) -> None:
+        headers = [(b"accept-ranges", b"bytes")] if scope["path"] == "/ranges" else []
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["path"] == "/ranges":
+            await send({"type": "http.response.body", "body": BODY.encode()})
+        else:
+            await send({"type": "http.response.pathsend", "path": "/tmp/file"})
+
+    metrics = CompressionMetrics()
+    middleware = CompressionMiddleware(app, metrics=metrics)
+    for path in ("/ranges", "/pathsend"):
+        sent: list[Message] = []
+
+        async def send(message: Message) -> None:
+            sent.append(message)  # noqa: B023
+
+        async def receive() -> Message:
+            return {"type": "http.request"}
+
+        scope = {
+            "type": "http",
+            "path": path,
+            "headers": [(b"accept-encoding", b"gzip")],
+        }
+        asyncio.run(middleware(scope, receive, send))
+        assert [message["type"] for message in sent][0] == "http.response.start"
+        assert len(sent) == 2
+        assert "content-encoding" not in Headers(raw=sent[0]["headers"])
+    assert metrics.stats() == []
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import patch
+
+import psycopg
+import pytest
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.api.routes.items import _stream_item_changes
+from app.core.config import settings
+from app.core.events import (
+    CHANNEL,
+    ItemChangeBroker,
+    Resync,
+    SubscriberLimitError,
+    parse_notification,
+)
+from app.models import ItemChangeEvent, ItemCreate
+from app.tests.utils.user import create_random_user
+
+
+def make_change(
+    owner_id: uuid.UUID,
+) -> tuple[tuple[datetime, uuid.UUID], ItemChangeEvent]:
+    event = ItemChangeEvent(op="upsert", id=uuid.uuid4(), owner_id=owner_id)
+    return (datetime.now(timezone.utc), event.id), event
+
+
+def test_parse_notification() -> None:
+    id, owner_id = uuid.uuid4(), uuid.uuid4()
+    payload = json.dumps(
+        {"op": "delete", "changes": [[str(id), str(owner_id), 1_500_000]]}
+    )
+    notification = parse_notification(payload)
+    assert isinstance(notification, list)
+    [((changed_at, position_id), event)] = notification
+    assert changed_at == datetime(1970, 1, 1, 0, 0, 1, 500_000, tzinfo=timezone.utc)
+    assert position_id == id
+    assert event == ItemChangeEvent(op="delete", id=id, owner_id=owner_id)
+    assert parse_notification(json.dumps({"resync": [str(owner_id)]})) == Resync(
+        frozenset([owner_id])
+    )
+    assert parse_notification(json.dumps({"resync": None})) == Resync(None)
+
+
+def test_broker_resyncs_owners() -> None:
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+    broker._thread = object()  # type: ignore[assignment]  # no listener
+    owner_id, other_id = uuid.uuid4(), uuid.uuid4()
+
+    async def run() -> None:
+        own = broker.subscribe(owner_id)
+        other = broker.subscribe(other_id)
+        everything = broker.subscribe(None)
+        broker.dispatch(json.dumps({"resync": [str(owner_id)]}))
+        await asyncio.sleep(0)
+        assert (own.queue.qsize(), other.queue.qsize()) == (1, 0)
+        assert everything.queue.get_nowait() is None
+        broker.dispatch(json.dumps({"resync": None}))
+        await asyncio.sleep(0)
+        assert (own.queue.qsize(), other.queue.qsize()) == (2, 1)
+
+    asyncio.run(run())
+
+
+def test_broker_drops_subscriptions_of_closed_loops() -> None:
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+    broker._thread = object()  # type: ignore[assignment]  # no listener
+    owner_id = uuid.uuid4()
+
+    async def subscribe() -> None:
+        broker.subscribe(owner_id)
+
+    asyncio.run(subscribe())
+    broker.publish(make_change(owner_id))
+    assert broker.subscriber_count == 0
+
+
+def test_listener_survives_invalid_notifications(db: Session) -> None:
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+    owner_id = uuid.uuid4()
+
+    async def run() -> Any:
+        subscription = broker.subscribe(owner_id)
+        await asyncio.sleep(0.5)  # let the listener connect
+        for payload in ("not json", json.dumps({"op": "upsert", "changes": [[1]]})):
+            db.exec(select(func.pg_notify(CHANNEL, payload)))
+            db.commit()
+        db.exec(select(func.pg_notify(CHANNEL, json.dumps({"resync": None}))))
+        db.commit()
+        return await asyncio.wait_for(subscription.queue.get(), timeout=5)
+
+    try:
+        assert asyncio.run(run()) is None
+    finally:
+        broker.close()
+
+
+def test_dead_listener_is_restarted() -> None:
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+
+    async def subscribe() -> None:
+        broker.subscribe(None)
+
+    with (
+        patch.object(broker, "_listen_until_stopped", side_effect=RuntimeError),
+        patch("threading.excepthook"),
+    ):
+        asyncio.run(subscribe())
+        thread = broker._thread
+        assert isinstance(thread, threading.Thread)
+        thread.join()
+    assert broker._thread is None
+
+
+def test_one_notification_per_statement(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    for n in range(60):
+        crud.create_item(
+            session=db, item_in=ItemCreate(title=f"item {n}"), owner_id=owner_id
+        )
+    payloads: list[str] = []
+    with psycopg.connect(
+        host=settings.POSTGRES_SERVER,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        dbname=settings.POSTGRES_DB,
+        autocommit=True,
+    ) as conn:
+        conn.execute(f"LISTEN {CHANNEL}")
+        crud.create_items(
+            session=db,
+            items=[(ItemCreate(title=f"batch {n}"), owner_id) for n in range(3)],
+        )
+        # The cascade of the user deletion is a single statement
+        crud.delete_user(session=db, user_id=owner_id)
+        payloads = [notify.payload for notify in conn.notifies(timeout=1.0)]
+    created, deleted = map(parse_notification, payloads)
+    assert isinstance(created, list)
+    assert [event.op for _, event in created] == ["upsert"] * 3
+    assert deleted == Resync(frozenset([owner_id]))
+
+
+def test_broker_filters_by_owner() -> None:
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+    owner_id, other_id = uuid.uuid4(), uuid.uuid4()
+
+    async def run() -> None:
+        own = broker.subscribe(owner_id)
+        everything = broker.subscribe(None)
+        broker.publish(make_change(owner_id))
+        broker.publish(make_change(other_id))
+        await asyncio.sleep(0)
+        assert own.queue.qsize() == 1
+        assert everything.queue.qsize() == 2
+        broker.unsubscribe(own)
+        broker.unsubscribe(everything)
+
+    broker._thread = object()  # type: ignore[assignment]  # no listener
+    asyncio.run(run())
+    assert broker.subscriber_count == 0
+
+
+def test_broker_subscriber_limit_and_overflow() -> None:
+    broker = ItemChangeBroker(max_subscribers=1, queue_size=2)
+    broker._thread = object()  # type: ignore[assignment]  # no listener
+    owner_id = uuid.uuid4()
+
+    async def run() -> None:
+        subscription = broker.subscribe(owner_id)
+        with pytest.raises(SubscriberLimitError):
+            broker.subscribe(owner_id)
+        for _ in range(3):
+            broker.publish(make_change(owner_id))
+        await asyncio.sleep(0)
+        # A stream that falls behind is told to resync
+        assert subscription.queue.qsize() == 1
+        assert subscription.queue.get_nowait() is None
+
+    asyncio.run(run())
+
+
+def test_stream_notified_and_replayed(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    broker = ItemChangeBroker(max_subscribers=10, queue_size=10)
+    first = crud.create_item(
+        session=db, item_in=ItemCreate(title="first"), owner_id=owner_id
+    )
+    since = (first.updated_at, first.id)
+
+    async def run() -> list[str]:
+        subscription = broker.subscribe(owner_id)
+        await asyncio.sleep(0.5)  # let the listener connect
+        stream = _stream_item_changes(subscription, since)  # type: ignore[arg-type]
+        await asyncio.to_thread(
+            crud.create_item,
+            session=db,
+            item_in=ItemCreate(title="second"),
+            owner_id=owner_id,
+        )
+        events = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return events
+
+    try:
+        with patch("app.api.routes.items.item_change_broker", broker):
+            replayed, notified = asyncio.run(run())
+    finally:
+        broker.close()
+    assert replayed.startswith("event: sync\nid: ")
+    assert notified.startswith("event: upsert\nid: ")
+    assert str(owner_id) in notified
+    assert broker.subscriber_count == 0
@@ -0,0 +1,56 @@
+import uuid
+from concurrent.futures import Future
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app import crud
+from app.group_commit import ItemCreateBatcher
+from app.models import Item, ItemCreate
+from app.tests.utils.user import create_random_user
+
+
+def test_concurrent_creations_share_a_commit(db: Session) -> None:
+    user = create_random_user(db)
+    batcher = ItemCreateBatcher(batch_size=3, max_delay=60.0)
+    batches: list[int] = []
+    original = crud.create_items
+
+    def create_items(**kwargs: Any) -> list[Item]:
+        batches.append(len(kwargs["items"]))
+        return original(**kwargs)
+
+    with patch("app.group_commit.crud.create_items", create_items):
+        # Full batches are written without waiting for the delay
+        futures = [
+            batcher.submit((ItemCreate(title=f"item {n}"), user.id)) for n in range(6)
+        ]
+        items = [future.result(timeout=10) for future in futures]
+        # The last ones are written on close
+        last = batcher.submit((ItemCreate(title="last"), user.id))
+        batcher.close()
+    assert batches == [3, 3, 1]
+    assert [item.title for item in items] == [f"item {n}" for n in range(6)]
+    assert last.result().title == "last"
+    for item in [*items, last.result()]:
+        assert item.owner_id == user.id
+        assert db.get(Item, item.id) is not None
+
+
+def test_failing_creation_does_not_fail_its_batch(db: Session) -> None:
+    user = create_random_user(db)
+    batcher = ItemCreateBatcher(batch_size=3, max_delay=60.0)
+    futures: list[Future[Item]] = [
+        batcher.submit((ItemCreate(title="kept"), user.id)),
+        # No such owner, rejected by the foreign key
+        batcher.submit((ItemCreate(title="orphan"), uuid.uuid4())),
+        batcher.submit((ItemCreate(title="kept too"), user.id)),
+    ]
+    batcher.close()
+    with pytest.raises(IntegrityError):
+        futures[1].result()
+    assert futures[0].result().title == "kept"
+    assert futures[2].result().title == "kept too"
@@ -0,0 +1,30 @@
+import time
+import uuid
+from unittest.mock import patch
+
+from app.core.ids import uuid7
+
+
+def test_uuid7_layout() -> None:
+    before = time.time_ns() // 1_000_000
+    id = uuid7()
+    after = time.time_ns() // 1_000_000
+    assert id.version == 7
+    assert id.variant == uuid.RFC_4122
+    assert before <= id.int >> 80 <= after + 1
+
+
+def test_uuid7_is_increasing() -> None:
+    ids = [uuid7() for _ in range(10_000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_uuid7_stays_increasing_within_a_millisecond() -> None:
+    # A frozen clock exhausts the counter, and then one that goes back
+    with patch("app.core.ids.time.time_ns", return_value=time.time_ns()):
+        ids = [uuid7() for _ in range(5_000)]
+    with patch("app.core.ids.time.time_ns", return_value=0):
+        ids.append(uuid7())
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,65 @@
+import uuid
+from collections.abc import Sequence
+from unittest.mock import patch
+
+from sqlmodel import Session
+
+from app.core.batching import Pending
+from app.loaders import EntityLoader
+from app.models import Item, User
+from app.tests.utils.item import create_random_item
+from app.tests.utils.user import create_random_user
+
+
+class RecordingLoader(EntityLoader[User]):
+    def __init__(self) -> None:
+        super().__init__(User, batch_size=3, max_delay=60.0)
+        self.batches: list[list[uuid.UUID]] = []
+
+    def process(self, batch: Sequence[Pending[uuid.UUID, User | None]]) -> None:
+        self.batches.append([pending.key for pending in batch])
+        super().process(batch)
+
+
+def test_concurrent_lookups_share_a_query(db: Session) -> None:
+    users = [create_random_user(db) for _ in range(3)]
+    missing = uuid.uuid4()
+    loader = RecordingLoader()
+    first = loader.submit(users[0].id)
+    # Waiting for the same batch, single flight
+    assert loader.submit(users[0].id) is first
+    futures = [first, loader.submit(missing), loader.submit(users[1].id)]
+    results = [future.result(timeout=10) for future in futures]
+    assert loader.batches == [[users[0].id, missing, users[1].id]]
+    assert results[0] and results[0].email == users[0].email
+    assert results[1] is None
+    assert results[2] and results[2].email == users[1].email
+
+    # Resolved, looked up again by the next batch
+    again = loader.submit(users[0].id)
+    assert again is not first
+    last = loader.submit(users[2].id)
+    loader.close()
+    assert loader.batches[1:] == [[users[0].id, users[2].id]]
+    assert again.result() is not None
+    assert last.result() is not None
+
+
+def test_get_merges_into_the_session(db: Session) -> None:
+    item = create_random_item(db)
+    loader = EntityLoader(Item, batch_size=10, max_delay=0.001)
+    with (
+        patch("app.core.config.settings.ENTITY_LOOKUP_BATCHING", True),
+        Session(db.get_bind()) as session,
+    ):
+        loaded = loader.get(session, item.id)
+        assert loaded is not None
+        assert loaded in session
+        assert (loaded.title, loaded.owner_id) == (item.title, item.owner_id)
+        # Changes go through the session of the request, as with session.get
+        loaded.title = "Renamed"
+        session.commit()
+        assert loader.get(session, uuid.uuid4()) is None
+    loader.close()
+    db.refresh(item)
+    assert item.title == "Renamed"
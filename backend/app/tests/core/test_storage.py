@@ -0,0 +1,166 @@
+import io
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.storage import LocalStorage, S3Storage, Storage, get_storage
+from app.main import app
+
+
+class _Body:
+    def __init__(self, data: bytes) -> None:
+        self._file = io.BytesIO(data)
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        while chunk := self._file.read(chunk_size):
+            yield chunk
+
+
+class _Paginator:
+    def __init__(self, client: "LocalS3Client") -> None:
+        self._client = client
+
+    def paginate(self, *, Bucket: str, Prefix: str) -> Iterator[dict[str, Any]]:
+        keys = sorted(
+            key for key in self._client.objects[Bucket] if key.startswith(Prefix)
+        )
+        # Pages of two keys, to go through the pagination
+        for start in range(0, len(keys), 2):
+            yield {"Contents": [{"Key": key} for key in keys[start : start + 2]]}
+
+
+class LocalS3Client:
+    """
+    In-memory stand-in for the subset of the boto3 S3 client used by S3Storage.
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[str, dict[str, bytes]] = {"bucket": {}}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+
+    def put_object(self, *, Bucket: str, Key: str, Body: bytes) -> None:
+        self.objects[Bucket][Key] = Body
+
+    def create_multipart_upload(self, *, Bucket: str, Key: str) -> dict[str, Any]:
+        upload_id = f"{Bucket}/{Key}/{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(
+        self, *, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes
+    ) -> dict[str, Any]:
+        assert UploadId.startswith(f"{Bucket}/{Key}/")
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(
+        self,
+        *,
+        Bucket: str,
+        Key: str,
+        UploadId: str,
+        MultipartUpload: dict[str, Any],
+    ) -> None:
+        parts = self.uploads.pop(UploadId)
+        self.objects[Bucket][Key] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+    def abort_multipart_upload(self, *, Bucket: str, Key: str, UploadId: str) -> None:
+        assert UploadId.startswith(f"{Bucket}/{Key}/")
+        del self.uploads[UploadId]
+
+    def get_object(self, *, Bucket: str, Key: str, Range: str) -> dict[str, Any]:
+        first, _, last = Range.removeprefix("bytes=").partition("-")
+        data = self.objects[Bucket][Key][int(first) : int(last) + 1]
+        return {"Body": _Body(data)}
+
+    def delete_object(self, *, Bucket: str, Key: str) -> None:
+        self.objects[Bucket].pop(Key, None)
+
+    def get_paginator(self, name: str) -> _Paginator:
+        assert name == "list_objects_v2"
+        return _Paginator(self)
+
+    def delete_objects(self, *, Bucket: str, Delete: dict[str, Any]) -> None:
+        for obj in Delete["Objects"]:
+            self.objects[Bucket].pop(obj["Key"], None)
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request: pytest.FixtureRequest, tmp_path: Path) -> Storage:
+    if request.param == "local":
+        return LocalStorage(tmp_path)
+    return S3Storage(LocalS3Client(), "bucket", part_size=10)
+
+
+def write(storage: Storage, key: str, chunks: list[bytes]) -> None:
+    writer = storage.open_writer(key)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.commit()
+
+
+def read(storage: Storage, key: str, start: int, end: int) -> bytes:
+    return b"".join(storage.read(key, start, end))
+
+
+def test_write_and_read(storage: Storage) -> None:
+    data = bytes(range(256)) * 3
+    write(storage, "owner/item/a", [data[:100], data[100:105], data[105:]])
+    write(storage, "owner/item/small", [b"tiny"])
+    assert read(storage, "owner/item/a", 0, len(data)) == data
+    assert read(storage, "owner/item/a", 10, 500) == data[10:500]
+    assert read(storage, "owner/item/a", 700, 700) == b""
+    assert read(storage, "owner/item/small", 0, 4) == b"tiny"
+
+
+def test_aborted_write_is_not_stored(storage: Storage) -> None:
+    writer = storage.open_writer("owner/item/a")
+    writer.write(b"x" * 25)
+    writer.abort()
+    with pytest.raises((FileNotFoundError, KeyError)):
+        read(storage, "owner/item/a", 0, 25)
+    if isinstance(storage, LocalStorage):
+        assert list(storage.root.rglob("*.part")) == []
+    else:
+        assert isinstance(storage, S3Storage)
+        assert storage.client.uploads == {}
+
+
+def test_delete(storage: Storage) -> None:
+    for key in ("a/1/x", "a/1/y", "a/1/z", "a/2/x", "b/1/x"):
+        write(storage, key, [key.encode()])
+    storage.delete("a/2/x")
+    storage.delete("a/2/x")
+    storage.delete_prefix("a/1/")
+    for key in ("a/1/x", "a/1/y", "a/1/z", "a/2/x"):
+        with pytest.raises((FileNotFoundError, KeyError)):
+            read(storage, key, 0, 5)
+    assert read(storage, "b/1/x", 0, 5) == b"b/1/x"
+
+
+def test_local_storage_rejects_keys_outside_root(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path)
+    for key in ("../x", "a//b", "/a", ""):
+        with pytest.raises(ValueError):
+            storage.open_writer(key)
+    assert storage.local_path("a/b") == tmp_path / "a" / "b"
+
+
+def test_start_fails_without_s3_client() -> None:
+    get_storage.cache_clear()
+    try:
+        with (
+            patch("app.core.config.settings.STORAGE_BACKEND", "s3"),
+            patch("app.core.storage.boto3", None),
+        ):
+            with pytest.raises(RuntimeError, match="s3 extra"):
+                with TestClient(app):
+                    pass
+    finally:
+        get_storage.cache_clear()
@@ -0,0 +1,310 @@
+from datetime import timedelta
+from typing import Any, Literal
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import Session, col, func, select, update
+
+from app import crud
+from app.core.db import engine
+from app.models import Item, ItemCreate, ItemPublic, ItemTombstone, ItemUpdate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import count_queries, random_lower_string
+
+
+def test_create_item_single_statement(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    item_in = ItemCreate(title=random_lower_string(), description="desc")
+    with Session(engine, expire_on_commit=False) as session:
+        with count_queries(engine) as statements:
+            item = crud.create_item(session=session, item_in=item_in, owner_id=owner_id)
+            assert item.title == item_in.title
+            assert item.owner_id == owner_id
+    assert len(statements) == 1
+    assert "INSERT INTO item" in statements[0]
+    assert "INSERT INTO outbox" in statements[0]
+
+
+def test_update_item_single_statement(db: Session) -> None:
+    item = create_random_item(db)
+    item_id, owner_id, description = item.id, item.owner_id, item.description
+    item_in = ItemUpdate(title="Updated title")
+    with Session(engine, expire_on_commit=False) as session:
+        with count_queries(engine) as statements:
+            updated = crud.update_item(
+                session=session, item_id=item_id, item_in=item_in, owner_id=owner_id
+            )
+            assert updated
+            assert updated.title == "Updated title"
+            assert updated.description == description
+    assert len(statements) == 1
+    assert "UPDATE item" in statements[0]
+    assert "INSERT INTO outbox" in statements[0]
+
+
+def test_update_item_other_owner(db: Session) -> None:
+    item = create_random_item(db)
+    other = create_random_user(db)
+    updated = crud.update_item(
+        session=db, item_id=item.id, item_in=ItemUpdate(title="x"), owner_id=other.id
+    )
+    assert updated is None
+    db.refresh(item)
+    assert item.title != "x"
+
+
+def test_delete_item_single_statement(db: Session) -> None:
+    item = create_random_item(db)
+    item_id, owner_id = item.id, item.owner_id
+    with Session(engine, expire_on_commit=False) as session:
+        with count_queries(engine) as statements:
+            assert crud.delete_item(session=session, item_id=item_id, owner_id=owner_id)
+    assert len(statements) == 1
+    assert "DELETE FROM item" in statements[0]
+    assert "INSERT INTO itemtombstone" in statements[0]
+    assert "INSERT INTO outbox" in statements[0]
+    assert not crud.delete_item(session=db, item_id=item_id, owner_id=None)
+
+
+def test_owner_query_prunes_partitions(db: Session) -> None:
+    item = create_random_item(db)
+    plan = db.execute(
+        text("EXPLAIN SELECT * FROM item WHERE owner_id = :owner_id"),
+        {"owner_id": item.owner_id},
+    ).scalars()
+    scanned = [line for line in plan if " on item_p" in line]
+    assert len(scanned) == 1
+
+
+def test_read_item_changes(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    kept = crud.create_item(
+        session=db, item_in=ItemCreate(title="kept"), owner_id=owner_id
+    )
+    gone = crud.create_item(
+        session=db, item_in=ItemCreate(title="gone"), owner_id=owner_id
+    )
+    kept_id, gone_id = kept.id, gone.id
+    changes = crud.read_item_changes(
+        session=db, owner_id=owner_id, since=None, limit=1, safety_window=timedelta()
+    )
+    assert [item.id for item in changes.upserted] == [kept_id]
+    assert changes.has_more
+    assert changes.watermark
+
+    since = crud.decode_watermark(changes.watermark)
+    assert crud.delete_item(session=db, item_id=gone_id, owner_id=owner_id)
+    changes = crud.read_item_changes(
+        session=db, owner_id=owner_id, since=since, limit=10, safety_window=timedelta()
+    )
+    assert changes.upserted == []
+    assert changes.deleted == [gone_id]
+    assert not changes.has_more
+
+
+def test_read_item_changes_holds_unsettled_watermark(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    crud.create_item(session=db, item_in=ItemCreate(title="new"), owner_id=owner_id)
+    changes = crud.read_item_changes(
+        session=db,
+        owner_id=owner_id,
+        since=None,
+        limit=10,
+        safety_window=timedelta(minutes=1),
+    )
+    assert len(changes.upserted) == 1
+    assert changes.watermark is None
+
+
+def test_prune_item_tombstones_batch(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    old, new = (
+        crud.create_item(session=db, item_in=ItemCreate(title=title), owner_id=owner_id)
+        for title in ("old", "new")
+    )
+    old_id, new_id = old.id, new.id
+    for item_id in (old_id, new_id):
+        assert crud.delete_item(session=db, item_id=item_id, owner_id=owner_id)
+    db.exec(
+        update(ItemTombstone)
+        .where(col(ItemTombstone.item_id) == old_id)
+        .values(deleted_at=func.now() - timedelta(days=2))
+    )  # type: ignore
+    db.commit()
+
+    assert crud.prune_item_tombstones_batch(
+        session=db, retention=timedelta(days=1), batch_size=1000
+    )
+    assert db.get(ItemTombstone, old_id) is None
+    assert db.get(ItemTombstone, new_id) is not None
+
+
+def test_read_items_page(db: Session) -> None:
+    item = create_random_item(db)
+    page = crud.read_items_page(session=db, owner_id=item.owner_id, skip=0, limit=10)
+    assert page.count == 1
+    assert page.data[0].model_dump() == ItemPublic.model_validate(item).model_dump()
+
+
+def test_read_items_page_bypasses_identity_map(db: Session) -> None:
+    owner_id = create_random_item(db).owner_id
+    with Session(engine) as session:
+        page = crud.read_items_page(
+            session=session, owner_id=owner_id, skip=0, limit=10
+        )
+        assert len(page.data) == 1
+        assert len(session.identity_map) == 0
+
+
+@pytest.mark.parametrize("mode", ["pipeline", "window"])
+def test_read_items_page_count(db: Session, mode: str) -> None:
+    owner_id = create_random_user(db).id
+    for _ in range(3):
+        crud.create_item(
+            session=db,
+            item_in=ItemCreate(title=random_lower_string()),
+            owner_id=owner_id,
+        )
+    with patch("app.core.config.settings.LIST_COUNT_MODE", mode):
+        page = crud.read_items_page(session=db, owner_id=owner_id, skip=1, limit=1)
+        assert (len(page.data), page.count) == (1, 3)
+        page = crud.read_items_page(session=db, owner_id=owner_id, skip=5, limit=1)
+        assert (page.data, page.count) == ([], 3)
+
+
+def test_fetch_pipelined(db: Session) -> None:
+    item = create_random_item(db)
+    counts, titles = crud.fetch_pipelined(
+        session=db,
+        statements=[
+            select(func.count()).where(Item.owner_id == item.owner_id),
+            select(Item.title).where(Item.owner_id == item.owner_id),
+        ],
+    )
+    assert counts == [(1,)]
+    assert titles == [(item.title,)]
+
+
+def test_read_items_page_prefix_upper_bound(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    for title in ("a\U0010ffff", "a\U0010ffffz", "b", "\ud7ffx", "\ue000"):
+        crud.create_item(session=db, item_in=ItemCreate(title=title), owner_id=owner_id)
+    page = crud.read_items_page(
+        session=db, owner_id=owner_id, skip=0, limit=10, title_prefix="a\U0010ffff"
+    )
+    assert sorted(item.title for item in page.data) == ["a\U0010ffff", "a\U0010ffffz"]
+    page = crud.read_items_page(
+        session=db, owner_id=owner_id, skip=0, limit=10, title_prefix="\ud7ff"
+    )
+    assert [item.title for item in page.data] == ["\ud7ffx"]
+
+
+@pytest.mark.parametrize(
+    "owned,sort,title_prefix,index",
+    [
+        (True, "title", "a", "owner_id_title_id_idx"),
+        (True, "created_at", None, "owner_id_created_at_id_idx"),
+        (True, "id", None, "owner_id_id_idx"),
+        (False, "id", None, "pkey"),
+    ],
+)
+def test_read_items_page_uses_index(
+    db: Session,
+    owned: bool,
+    sort: Literal["title", "created_at", "id"],
+    title_prefix: str | None,
+    index: str,
+) -> None:
+    owner_id = create_random_user(db).id if owned else None
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append((args[2], args[3]))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with patch("app.core.config.settings.LIST_COUNT_MODE", "window"):
+            crud.read_items_page(
+                session=db,
+                owner_id=owner_id,
+                skip=0,
+                limit=10,
+                sort=sort,
+                descending=True,
+                title_prefix=title_prefix,
+                has_description=True,
+            )
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    statement, parameters = executed[0]
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    lines = plan.scalars().all()
+    db.rollback()
+    # The rows come in order from the partition indexes, which are named after
+    # the columns of the parent index, and are never sorted
+    assert any(f"{index} on item_p" in line for line in lines)
+    assert not any("Sort  (" in line for line in lines)
+
+
+def test_read_items_page_unindexed_query(db: Session) -> None:
+    with pytest.raises(crud.UnindexedItemQueryError):
+        crud.read_items_page(session=db, owner_id=None, skip=0, limit=10, sort="title")
+    with pytest.raises(crud.UnindexedItemQueryError):
+        crud.read_items_page(
+            session=db, owner_id=None, skip=0, limit=10, title_prefix="a"
+        )
+
+
+@pytest.mark.parametrize("all_tags", [False, True])
+def test_read_items_page_tags_use_gin_index(db: Session, all_tags: bool) -> None:
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append((args[2], args[3]))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with patch("app.core.config.settings.LIST_COUNT_MODE", "window"):
+            crud.read_items_page(
+                session=db,
+                owner_id=None,
+                skip=0,
+                limit=10,
+                tags=["a", "b"],
+                all_tags=all_tags,
+            )
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    statement, parameters = executed[0]
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    lines = plan.scalars().all()
+    db.rollback()
+    assert any(
+        "Bitmap Index Scan on item_p" in line and "_tags_idx" in line for line in lines
+    )
+
+
+def test_read_item_tags(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    for tags in (["b", "a"], ["b"], []):
+        crud.create_item(
+            session=db, item_in=ItemCreate(title="Foo", tags=tags), owner_id=owner_id
+        )
+    counts = crud.read_item_tags(session=db, owner_id=owner_id)
+    assert [(count.tag, count.count) for count in counts.data] == [("b", 2), ("a", 1)]
+
+
+def test_update_item_tags(db: Session) -> None:
+    item = create_random_item(db)
+    updated = crud.update_item(
+        session=db,
+        item_id=item.id,
+        item_in=ItemUpdate(tags=["New", "new", "old"]),
+        owner_id=item.owner_id,
+    )
+    assert updated
+    assert updated.tags == ["new", "old"]
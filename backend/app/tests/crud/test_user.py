@@ -1,10 +1,25 @@
+from typing import Any
+from unittest.mock import patch
+
+import pytest
 from fastapi.encoders import jsonable_encoder
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import Session, select, text
 
 from app import crud
+from app.core.db import engine
 from app.core.security import verify_password
-from app.models import User, UserCreate, UserUpdate
-from app.tests.utils.utils import random_email, random_lower_string
+from app.models import (
+    Item,
+    ItemCreate,
+    Job,
+    User,
+    UserCreate,
+    UserDeletion,
+    UserUpdate,
+)
+from app.tests.utils.utils import count_queries, random_email, random_lower_string
 
 
 def test_create_user(db: Session) -> None:
@@ -33,6 +48,92 @@ def test_not_authenticate_user(db: Session) -> None:
     assert user is None
 
 
+def test_authenticate_user_ignores_email_case(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    authenticated_user = crud.authenticate(
+        session=db, email=email.upper(), password=password
+    )
+    assert authenticated_user
+    assert authenticated_user.id == user.id
+
+
+def test_email_unique_regardless_of_case(db: Session) -> None:
+    email = random_email()
+    crud.create_user(
+        session=db, user_create=UserCreate(email=email, password="password")
+    )
+    with pytest.raises(crud.EmailAlreadyExistsError):
+        crud.create_user(
+            session=db, user_create=UserCreate(email=email.upper(), password="password")
+        )
+
+
+def test_get_user_by_email_uses_index(db: Session) -> None:
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append((args[2], args[3]))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        crud.get_user_by_email(session=db, email=random_email().upper())
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    [(statement, parameters)] = executed
+    # The table is too small in tests for the planner to prefer the index
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    lines = plan.scalars().all()
+    db.rollback()
+    assert any("ix_user_email_lower" in line for line in lines)
+
+
+@pytest.mark.parametrize("mode", ["pipeline", "window"])
+def test_read_users_page_after(db: Session, mode: str) -> None:
+    marker = random_lower_string()
+    emails = sorted(f"{n}{marker}@example.com" for n in range(3))
+    for email in emails:
+        crud.create_user(
+            session=db, user_create=UserCreate(email=email, password="password")
+        )
+    with patch("app.core.config.settings.LIST_COUNT_MODE", mode):
+        page = crud.read_users_page(
+            session=db, skip=0, limit=10, q=marker, after=emails[0].upper()
+        )
+    assert [user.email for user in page.data] == emails[1:]
+    assert page.count == 3
+
+
+def test_search_users_uses_trigram_index(db: Session) -> None:
+    installed = db.exec(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")  # type: ignore
+    ).first()
+    if not installed:
+        pytest.skip("pg_trgm is not available")
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append((args[2], args[3]))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with patch("app.core.config.settings.LIST_COUNT_MODE", "window"):
+            crud.read_users_page(session=db, skip=0, limit=10, q=random_lower_string())
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    statement, parameters = executed[0]
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    lines = plan.scalars().all()
+    db.rollback()
+    assert any("ix_user_email_trgm" in line for line in lines)
+    assert any("ix_user_full_name_trgm" in line for line in lines)
+
+
 def test_check_if_user_is_active(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -89,3 +190,161 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def test_create_user_statements() -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    with Session(engine, expire_on_commit=False) as session:
+        with count_queries(engine) as statements:
+            user = crud.create_user(session=session, user_create=user_in)
+            assert user.email == user_in.email
+            assert user.id
+    # The email check, then the insert with its outbox event
+    assert len(statements) == 2
+    assert "ON CONFLICT" in statements[1]
+
+
+def test_create_user_email_taken_skips_hash(db: Session) -> None:
+    email = random_email()
+    crud.create_user(
+        session=db, user_create=UserCreate(email=email, password="password")
+    )
+    user_in = UserCreate(email=email.upper(), password=random_lower_string())
+    with Session(engine) as session:
+        with (
+            count_queries(engine) as statements,
+            patch("app.crud.get_password_hash") as get_password_hash,
+        ):
+            with pytest.raises(crud.EmailAlreadyExistsError):
+                crud.create_user(session=session, user_create=user_in)
+    assert len(statements) == 1
+    get_password_hash.assert_not_called()
+
+
+def test_update_user_email_taken(db: Session) -> None:
+    taken = random_email()
+    crud.create_user(
+        session=db, user_create=UserCreate(email=taken, password="password")
+    )
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=random_email(), password="password")
+    )
+    user_id, email = user.id, user.email
+    with pytest.raises(crud.EmailAlreadyExistsError):
+        crud.update_user(
+            session=db, db_user=user, user_in=UserUpdate(email=taken.upper())
+        )
+    db_user = db.get(User, user_id)
+    assert db_user
+    assert db_user.email == email
+
+
+def test_create_users_skips_taken_emails(db: Session) -> None:
+    taken = crud.create_user(
+        session=db, user_create=UserCreate(email=random_email(), password="password")
+    )
+    users = [
+        User(email=email, hashed_password="hash")
+        for email in (random_email(), taken.email.upper(), random_email())
+    ]
+    assert crud.read_taken_emails(
+        session=db, emails=[user.email for user in users]
+    ) == {taken.email.lower()}
+    with Session(engine, expire_on_commit=False) as session:
+        with count_queries(engine) as statements:
+            created = crud.create_users(session=session, users=users)
+    assert len(statements) == 1
+    assert [user.email for user in created] == [users[0].email, users[2].email]
+
+
+def test_update_user_single_statement(db: Session) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    with Session(engine, expire_on_commit=False) as session:
+        db_user = session.get(User, user.id)
+        assert db_user
+        with count_queries(engine) as statements:
+            updated = crud.update_user(
+                session=session, db_user=db_user, user_in=UserUpdate(full_name="New")
+            )
+            assert updated.full_name == "New"
+            assert updated.email == user.email
+    assert len(statements) == 1
+
+
+def test_delete_user_does_not_load_items(db: Session) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    user_id = user.id
+    for _ in range(3):
+        crud.create_item(
+            session=db,
+            item_in=ItemCreate(title=random_lower_string()),
+            owner_id=user_id,
+        )
+    with Session(engine) as session:
+        db_user = session.get(User, user_id)
+        assert db_user
+        with pytest.raises(InvalidRequestError):
+            _ = db_user.items
+        with count_queries(engine) as statements:
+            session.delete(db_user)
+            session.commit()
+    assert len(statements) == 1
+    assert statements[0].startswith("DELETE FROM")
+    items = db.exec(select(Item).where(Item.owner_id == user_id)).all()
+    assert items == []
+
+
+def test_request_user_deletion_hides_user(db: Session) -> None:
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=random_email(), password=password)
+    )
+    crud.create_item(session=db, item_in=ItemCreate(title="a"), owner_id=user.id)
+    crud.create_item(session=db, item_in=ItemCreate(title="b"), owner_id=user.id)
+    crud.request_user_deletion(session=db, user=user)
+    db.refresh(user)
+    assert user.pending_deletion
+    assert not user.is_active
+    # Queued in the same transaction
+    job = db.exec(
+        select(Job).where(
+            Job.task == "purge_user", Job.payload["user_id"].astext == str(user.id)
+        )
+    ).one()
+    db.delete(job)
+    db.commit()
+
+    deleted = crud.delete_user_items_batch(session=db, user_id=user.id, batch_size=1)
+    assert deleted == 1
+    deletion = db.get(UserDeletion, user.id)
+    assert deletion
+    db.refresh(deletion)
+    assert deletion.items_deleted == 1
+    assert deletion.completed_at is None
+
+    crud.delete_user_items_batch(session=db, user_id=user.id, batch_size=1)
+    crud.complete_user_deletion(session=db, user_id=user.id)
+    db.refresh(deletion)
+    assert deletion.items_deleted == 2
+    assert deletion.completed_at is not None
+    assert db.exec(select(User).where(User.id == user.id)).first() is None
+
+
+def test_delete_user(db: Session) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    user_id = user.id
+    crud.create_item(
+        session=db, item_in=ItemCreate(title=random_lower_string()), owner_id=user_id
+    )
+    crud.delete_user(session=db, user_id=user_id)
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).all() == []
@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from sqlmodel import Session, col, select
+
+from app import crud, outbox
+from app.core.storage import LocalStorage
+from app.models import ItemCreate, OutboxEvent, UserCreate
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def test_writes_record_outbox_events(db: Session) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    statement = select(OutboxEvent).where(
+        OutboxEvent.topic == "user.created",
+        col(OutboxEvent.payload)["id"].astext == str(user.id),
+    )
+    event = db.exec(statement).one()
+    assert event.payload["email"] == user.email
+    assert "hashed_password" not in event.payload
+    assert event.attempts == 0
+
+
+def test_relay_dispatches_and_deletes_events(db: Session) -> None:
+    owner_id = create_random_user(db).id
+    item = crud.create_item(
+        session=db, item_in=ItemCreate(title="relayed"), owner_id=owner_id
+    )
+    item_id = str(item.id)
+    received: list[dict[str, Any]] = []
+
+    def handler(_topic: str, payload: dict[str, Any]) -> None:
+        received.append(payload)
+
+    with patch.dict(outbox._handlers, {"item.created": [handler]}):
+        while outbox.relay_batch(session=db, batch_size=1000):
+            pass
+    assert item_id in [payload["id"] for payload in received]
+    statement = select(OutboxEvent).where(
+        col(OutboxEvent.payload)["id"].astext == item_id
+    )
+    assert db.exec(statement).all() == []
+
+
+def test_relay_retries_failed_events(db: Session) -> None:
+    event = OutboxEvent(topic="test.failing", payload={"id": random_lower_string()})
+    db.add(event)
+    db.commit()
+    event_id = event.id
+
+    def handler(_topic: str, _payload: dict[str, Any]) -> None:
+        raise RuntimeError("unavailable")
+
+    with patch.dict(outbox._handlers, {"test.failing": [handler]}):
+        outbox.relay_batch(session=db, batch_size=1000)
+    db.expire_all()
+    failed = db.get(OutboxEvent, event_id)
+    assert failed
+    assert failed.attempts == 1
+    assert failed.last_error == "RuntimeError('unavailable')"
+    assert failed.available_at and failed.created_at
+    assert failed.available_at > failed.created_at
+    db.delete(failed)
+    db.commit()
+
+
+def test_relay_deletes_files_of_deleted_items(db: Session, tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path)
+    owner_id = create_random_user(db).id
+    kept_id, deleted_id = (
+        crud.create_item(
+            session=db, item_in=ItemCreate(title=title), owner_id=owner_id
+        ).id
+        for title in ("kept", "deleted")
+    )
+    for item_id in (kept_id, deleted_id):
+        writer = storage.open_writer(f"{owner_id}/{item_id}/attachment")
+        writer.write(b"data")
+        writer.commit()
+    crud.delete_item(session=db, item_id=deleted_id, owner_id=owner_id)
+    with patch("app.attachments.get_storage", return_value=storage):
+        while outbox.relay_batch(session=db, batch_size=1000):
+            pass
+    assert not (tmp_path / str(owner_id) / str(deleted_id)).exists()
+    assert (tmp_path / str(owner_id) / str(kept_id) / "attachment").exists()
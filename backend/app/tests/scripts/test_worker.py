@@ -0,0 +1,74 @@
+import threading
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+from sqlmodel import Session
+
+from app import crud, worker
+from app.models import JOB_DEAD, JOB_QUEUED, JOB_RUNNING, Job
+
+
+def test_worker_runs_and_deletes_job(db: Session) -> None:
+    calls: list[dict[str, Any]] = []
+
+    def record(**payload: Any) -> None:
+        calls.append(payload)
+
+    job_id = crud.enqueue_job(session=db, task="record", payload={"value": 1})
+    db.commit()
+    with patch.dict(worker._tasks, {"record": record}):
+        worker.work(threading.Event(), once=True)
+    assert calls == [{"value": 1}]
+    assert db.get(Job, job_id) is None
+
+
+def test_worker_retries_then_gives_up(db: Session) -> None:
+    def fail() -> None:
+        raise RuntimeError("unavailable")
+
+    job_id = crud.enqueue_job(session=db, task="fail", max_attempts=2)
+    db.commit()
+    with patch.dict(worker._tasks, {"fail": fail}):
+        assert worker.run_next_job()
+        db.expire_all()
+        job = db.get(Job, job_id)
+        assert job
+        assert (job.status, job.attempts) == (JOB_QUEUED, 1)
+        assert job.last_error == "RuntimeError('unavailable')"
+        # Not due before its retry delay
+        assert not worker.run_next_job()
+
+        job.run_at = job.created_at
+        db.add(job)
+        db.commit()
+        assert worker.run_next_job()
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert (job.status, job.attempts) == (JOB_DEAD, 2)
+    db.delete(job)
+    db.commit()
+
+
+def test_claim_after_visibility_timeout(db: Session) -> None:
+    job_id = crud.enqueue_job(session=db, task="slow", max_attempts=1)
+    db.commit()
+    with Session(db.get_bind(), expire_on_commit=False) as session:
+        (claimed,) = crud.claim_jobs(
+            session=session, limit=10, visibility_timeout=timedelta()
+        )
+        assert (claimed.id, claimed.status) == (job_id, JOB_RUNNING)
+        # Timed out without attempts left: dead instead of claimed again
+        assert (
+            crud.claim_jobs(session=session, limit=10, visibility_timeout=timedelta())
+            == []
+        )
+        # The late worker does not delete it
+        crud.complete_job(session=session, job=claimed)
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == JOB_DEAD
+    db.delete(job)
+    db.commit()
@@ -0,0 +1,117 @@
+import argparse
+import logging
+import signal
+import threading
+import uuid
+from collections.abc import Callable
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app import crud, purge
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+Task = Callable[..., None]
+
+_tasks: dict[str, Task] = {}
+
+
+def task(name: str) -> Callable[[Task], Task]:
+    """
+    Register the decorated function as the worker task `name`, called with
+    the payload of its jobs as keyword arguments.
+
+    A job is run again if its worker dies or outlives the visibility timeout,
+    so tasks must be idempotent.
+    """
+
+    def decorator(function: Task) -> Task:
+        _tasks[name] = function
+        return function
+
+    return decorator
+
+
+@task("purge_user")
+def purge_user(user_id: str) -> None:
+    purge.purge_user(uuid.UUID(user_id))
+
+
+def run_job(job: Job) -> None:
+    try:
+        _tasks[job.task](**job.payload)
+    except Exception as e:
+        logger.exception(f"Job {job.id} ({job.task}) failed")
+        delay = settings.JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+        with Session(engine) as session:
+            crud.fail_job(
+                session=session,
+                job=job,
+                error=repr(e),
+                retry_delay=timedelta(seconds=delay),
+            )
+    else:
+        with Session(engine) as session:
+            crud.complete_job(session=session, job=job)
+
+
+def run_next_job() -> bool:
+    """
+    Claim and run one due job, returning False if there was none.
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        jobs = crud.claim_jobs(
+            session=session,
+            limit=1,
+            visibility_timeout=timedelta(
+                seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+            ),
+        )
+    for job in jobs:
+        run_job(job)
+    return bool(jobs)
+
+
+def work(stop: threading.Event, *, once: bool = False) -> None:
+    while not stop.is_set():
+        if not run_next_job():
+            if once:
+                return
+            stop.wait(settings.WORKER_POLL_SECONDS)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run the queued background jobs.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="jobs run at the same time",
+    )
+    parser.add_argument("--once", action="store_true", help="exit once no job is due")
+    args = parser.parse_args()
+
+    # Running jobs are finished before exiting
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    logger.info(f"Running jobs with {args.concurrency} threads")
+    threads = [
+        threading.Thread(target=work, args=(stop,), kwargs={"once": args.once})
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark deleting a user that owns a large number of items.
+
+Compares the passive delete of User, which leaves the items to the ON DELETE
+CASCADE of the database, with the ORM cascade User.items had before it used
+passive_deletes: a mapping of the same tables without it loads every item of
+the user and deletes them one by one before the user.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.delete_user --items 100000
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.orm import DeclarativeBase, Mapped, relationship
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.security import get_password_hash
+from app.models import Item, User
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+class LegacyBase(DeclarativeBase):
+    pass
+
+
+class LegacyItem(LegacyBase):
+    __table__ = Item.__table__  # type: ignore[assignment]
+
+
+class LegacyUser(LegacyBase):
+    __table__ = User.__table__  # type: ignore[assignment]
+
+    # User.items before passive_deletes and lazy="raise"
+    items: Mapped[list[LegacyItem]] = relationship(
+        cascade="all, delete-orphan", overlaps="items,owner"
+    )
+
+
+def create_user_with_items(n_items: int) -> uuid.UUID:
+    with Session(engine) as session:
+        user = User(
+            email=f"bench-{uuid.uuid4().hex}@example.com",
+            hashed_password=get_password_hash("benchmark"),
+        )
+        session.add(user)
+        session.commit()
+        user_id = user.id
+        session.execute(
+            text(
+                "INSERT INTO item (id, owner_id, title, description) "
+                "SELECT gen_random_uuid(), :owner_id, 'item ' || n, NULL "
+                "FROM generate_series(1, :n) AS n"
+            ),
+            {"owner_id": user_id, "n": n_items},
+        )
+        session.commit()
+    return user_id
+
+
+def delete_user(user_id: uuid.UUID, *, passive: bool) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with Session(engine) as session:
+        user = session.get(User if passive else LegacyUser, user_id)
+        assert user
+        session.delete(user)
+        session.commit()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for label, passive in (("passive", True), ("ORM cascade", False)):
+        user_id = create_user_with_items(args.items)
+        elapsed, peak = delete_user(user_id, passive=passive)
+        logger.info(
+            "%s delete of %d items: %.3fs, peak memory %.1f MiB",
+            label,
+            args.items,
+            elapsed,
+            peak / 2**20,
+        )
+
+
+if __name__ == "__main__":
+    main()
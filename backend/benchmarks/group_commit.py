@@ -0,0 +1,88 @@
+"""
+Benchmark creating items from many concurrent requests, with and without the
+group commit of item creations.
+
+Without it, every creation is its own transaction and waits for its own
+commit; with it, the creations submitted together are inserted by one
+transaction. Threads stand in for the requests, calling crud.create_item or
+the batcher directly, through the connection pool of the application.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.group_commit --items 20000 --concurrency 64
+"""
+
+import argparse
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, delete
+
+from app import crud
+from app.core.db import engine
+from app.core.security import get_password_hash
+from app.group_commit import ItemCreateBatcher
+from app.models import ItemCreate, User
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def create_user() -> uuid.UUID:
+    with Session(engine) as session:
+        user = User(
+            email=f"bench-{uuid.uuid4().hex}@example.com",
+            hashed_password=get_password_hash("benchmark"),
+        )
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def create_one(owner_id: uuid.UUID, n: int) -> None:
+    with Session(engine, expire_on_commit=False) as session:
+        crud.create_item(
+            session=session, item_in=ItemCreate(title=f"item {n}"), owner_id=owner_id
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    owner_id = create_user()
+    batcher = ItemCreateBatcher(batch_size=args.batch_size, max_delay=args.max_delay)
+
+    def create_batched(n: int) -> None:
+        batcher.submit((ItemCreate(title=f"item {n}"), owner_id)).result()
+
+    for label, create in (
+        ("one commit per item", lambda n: create_one(owner_id, n)),
+        ("group commit", create_batched),
+    ):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            list(executor.map(create, range(args.items)))
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "%s: %d items in %.1fs, %.0f items/s",
+            label,
+            args.items,
+            elapsed,
+            args.items / elapsed,
+        )
+    batcher.close()
+
+    with Session(engine) as session:
+        session.exec(delete(User).where(User.id == owner_id))  # type: ignore
+        session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark a round trip of a page of items through JSON and MessagePack.
+
+Each round trip serializes the page the way the list routes do, then decodes
+and validates it back into ItemsPublic as a client sharing the models would.
+Needs no database, run from the backend directory:
+
+    python -m benchmarks.msgpack_roundtrip --items 100 --rounds 2000
+"""
+
+import argparse
+import logging
+import time
+from collections.abc import Callable
+
+import msgpack
+
+from app.models import ItemPublic, ItemsPublic
+from benchmarks.serialize_items import make_rows
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def json_encode(page: ItemsPublic) -> bytes:
+    return page.model_dump_json().encode()
+
+
+def json_decode(body: bytes) -> ItemsPublic:
+    return ItemsPublic.model_validate_json(body)
+
+
+def msgpack_encode(page: ItemsPublic) -> bytes:
+    return msgpack.packb(page.model_dump(mode="json"))  # type: ignore[no-any-return]
+
+
+def msgpack_decode(body: bytes) -> ItemsPublic:
+    return ItemsPublic.model_validate(msgpack.unpackb(body))
+
+
+def measure(
+    page: ItemsPublic,
+    encode: Callable[[ItemsPublic], bytes],
+    decode: Callable[[bytes], ItemsPublic],
+    n_rounds: int,
+) -> tuple[float, float, int]:
+    """
+    Mean encoding and decoding times, and the size of the encoded page.
+    """
+    body = encode(page)
+    assert decode(body) == page
+    start = time.perf_counter()
+    for _ in range(n_rounds):
+        encode(page)
+    encoded = time.perf_counter()
+    for _ in range(n_rounds):
+        decode(body)
+    decoded = time.perf_counter()
+    return (encoded - start) / n_rounds, (decoded - encoded) / n_rounds, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    items = [ItemPublic(**row) for row in make_rows(args.items)]
+    page = ItemsPublic(data=items, count=len(items))
+    for name, encode, decode in (
+        ("json", json_encode, json_decode),
+        ("msgpack", msgpack_encode, msgpack_decode),
+    ):
+        encode_time, decode_time, size = measure(page, encode, decode, args.rounds)
+        logger.info(
+            "%-8s %d items: encode %.3f ms, decode %.3f ms, %d bytes",
+            name,
+            args.items,
+            encode_time * 1000,
+            decode_time * 1000,
+            size,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark inserting rows keyed by random (version 4) or time-ordered
+(version 7) UUIDs into a large table.
+
+Each version fills its own table, shaped like item (a UUID primary key and a
+title), in batches of one multi-row INSERT per transaction as the API does,
+logging the insert rate as the table grows and the size of the primary key
+index at the end. Random keys land anywhere in the index: once it is larger
+than shared_buffers most inserts read a page from disk and split it, while
+time-ordered keys always append to its rightmost leaf.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.uuid_inserts --rows 2000000
+"""
+
+import argparse
+import logging
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import text
+
+from app.core.db import engine
+from app.core.ids import uuid7
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+VERSIONS: dict[str, Callable[[], uuid.UUID]] = {"v4": uuid.uuid4, "v7": uuid7}
+
+
+def insert_rows(
+    table: str, new_id: Callable[[], uuid.UUID], *, rows: int, batch_size: int
+) -> float:
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        connection.execute(
+            text(f"CREATE TABLE {table} (id uuid PRIMARY KEY, title varchar(255))")
+        )
+    statement = text(f"INSERT INTO {table} (id, title) VALUES (:id, :title)")
+    report_every = max(rows // 10, batch_size)
+    start = last = time.perf_counter()
+    for inserted in range(0, rows, batch_size):
+        batch = [
+            {"id": new_id(), "title": f"item {n}"}
+            for n in range(inserted, min(inserted + batch_size, rows))
+        ]
+        with engine.begin() as connection:
+            connection.execute(statement, batch)
+        done = inserted + len(batch)
+        if done % report_every < batch_size:
+            now = time.perf_counter()
+            logger.info(
+                "  %s: %d rows, %.0f rows/s", table, done, report_every / (now - last)
+            )
+            last = now
+    return time.perf_counter() - start
+
+
+def index_size(table: str) -> int:
+    with engine.connect() as connection:
+        size = connection.execute(
+            text("SELECT pg_relation_size(:index)"), {"index": f"{table}_pkey"}
+        ).scalar_one()
+    return int(size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the tables for inspection"
+    )
+    args = parser.parse_args()
+
+    for version, new_id in VERSIONS.items():
+        table = f"bench_uuid_{version}"
+        elapsed = insert_rows(table, new_id, rows=args.rows, batch_size=args.batch_size)
+        logger.info(
+            "%s: %d rows in %.1fs, %.0f rows/s, primary key %.1f MiB",
+            version,
+            args.rows,
+            elapsed,
+            args.rows / elapsed,
+            index_size(table) / 2**20,
+        )
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE {table}"))
+
+
+if __name__ == "__main__":
+    main()